@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark globalNav extraction from the products page: the old
+BeautifulSoup + character-by-character brace scan against nav_extract.
+
+Usage:
+  ./bench_extract.py                        # synthetic page
+  ./bench_extract.py page1.html page2.html  # saved copies of the products page
+  ./bench_extract.py --save page.html       # download the live page first
+
+Save a copy with e.g. `curl -o page.html https://aws.amazon.com/products/`.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'periodic'))
+
+from bs4 import BeautifulSoup
+from nav_extract import extract_nav_data, extract_nav_data_soup
+
+
+def extract_before(content):
+    """The extraction loop get_data_from_scrape used before nav_extract."""
+    soup = BeautifulSoup(content, 'html.parser')
+    for script in soup.find_all('script'):
+        if script.string and 'globalNav' in script.string and len(script.string) > 10000:
+            text = script.string
+            start_idx = text.find('{"data":{"items"')
+            if start_idx != -1:
+                brace_count = 0
+                for i in range(start_idx, len(text)):
+                    if text[i] == '{':
+                        brace_count += 1
+                    elif text[i] == '}':
+                        brace_count -= 1
+                        if brace_count == 0:
+                            try:
+                                data = json.loads(text[start_idx:i + 1])
+                            except ValueError:
+                                # unbalanced braces inside a JSON string end the scan early
+                                return None
+                            return json.loads(data['data']['items'][0]['fields']['globalNav'])
+            break
+    return None
+
+
+def synthetic_page(categories=30, services=400):
+    """A products page shaped like the real one: lots of markup, a large nav JSON script."""
+    sub_nav = [{'name': 'Featured Products', 'columns': []}]
+    for c in range(categories):
+        items = [{'title': f"Amazon Service {c}-{i}", 'hyperLink': f"https://aws.amazon.com/s{c}-{i}/",
+                  'body': 'Managed {service} with "quotes" and {braces}'}
+                 for i in range(services // categories)]
+        sub_nav.append({'name': f"Category {c}", 'columns': [{'items': items[:len(items) // 2]},
+                                                              {'sections': [{'items': items[len(items) // 2:]}]}]})
+    nav = {'items': [{'name': 'Products', 'subNav': sub_nav}]}
+    payload = json.dumps({'data': {'items': [{'fields': {'globalNav': json.dumps(nav)}}]}}, separators=(',', ':'))
+    markup = ''.join(f'<div class="lb-col"><a href="/p{i}">Product {i}</a><p>Text {i}</p></div>' for i in range(5000))
+    return (f'<html><head><script>var cfg={{"a":1}};</script></head><body>{markup}'
+            f'<script>window.globalNav={payload};</script>{markup}</body></html>').encode('utf-8')
+
+
+def timed(fn, content, rounds):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        result = fn(content)
+    return result, (time.perf_counter() - started) / rounds * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('pages', nargs='*', help='Saved copies of https://aws.amazon.com/products/')
+    parser.add_argument('--save', metavar='PATH', help='Download the live page to PATH and benchmark it')
+    parser.add_argument('--rounds', type=int, default=5, help='Runs per measurement (default: 5)')
+    args = parser.parse_args()
+
+    pages = []
+    if args.save:
+        from http_client import get
+        with open(args.save, 'wb') as f:
+            f.write(get('https://aws.amazon.com/products/', timeout=30).content)
+        args.pages.append(args.save)
+    for path in args.pages:
+        with open(path, 'rb') as f:
+            pages.append((path, f.read()))
+    if not pages:
+        pages.append(('synthetic', synthetic_page()))
+
+    for name, content in pages:
+        before, before_ms = timed(extract_before, content, args.rounds)
+        after, after_ms = timed(extract_nav_data, content, args.rounds)
+        _, soup_ms = timed(extract_nav_data_soup, content, args.rounds)
+        print(f"{name} ({len(content) / 1024:.0f} KB)")
+        print(f"  before (soup + brace scan): {before_ms:8.2f} ms")
+        print(f"  raw_decode fast path:       {after_ms:8.2f} ms")
+        print(f"  soup fallback path:         {soup_ms:8.2f} ms")
+        print(f"  speedup:                    {before_ms / after_ms:8.1f}x")
+        if before is None:
+            print("  before: FAILED (no nav data extracted)")
+        else:
+            print(f"  same result:                {before == after}")
+
+
+if __name__ == '__main__':
+    main()
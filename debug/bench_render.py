@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark page rendering per data source: the old per-source
+pystache.render(template_string) path against the parsed-once TemplateEngine,
+without and with memoized tile/legend fragments. The memoized engine is
+measured cold (new engine, every fragment rendered), warm (same data again)
+and with --changed services edited between renders.
+
+Usage:
+  ./bench_render.py                 # 300 services per source, 20 rounds
+  ./bench_render.py --services 2000 --rounds 5 --changed 20
+"""
+import argparse
+import os
+import sys
+import time
+
+debug_dir = os.path.dirname(os.path.abspath(__file__))
+periodic_dir = os.path.join(debug_dir, '..', 'periodic')
+os.chdir(periodic_dir)  # pystache looks up partials relative to the cwd
+sys.path.insert(0, periodic_dir)
+sys.path.insert(0, debug_dir)
+
+import pystache
+from fixtures import synthetic_periodic
+from layout import get_layout
+from template_engine import TemplateEngine
+
+
+def per_call(fn, rounds):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - started) / rounds * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--services', type=int, default=300, help='Services per source (default: 300)')
+    parser.add_argument('--rounds', type=int, default=20, help='Renders per measurement (default: 20)')
+    parser.add_argument('--changed', type=int, default=10,
+                        help='Services edited between renders for the "few changed" case (default: 10)')
+    args = parser.parse_args()
+
+    data = get_layout('classic').place(synthetic_periodic(args.services))
+    services = [service for category in data['categories'] for service in category['services']]
+
+    def render_before():
+        with open('base_template.mustache', 'r') as f:
+            return pystache.render(f.read(), data)
+
+    started = time.perf_counter()
+    plain = TemplateEngine('base_template', memoize=False)
+    load_ms = (time.perf_counter() - started) * 1000
+
+    expected = render_before()
+    assert expected == plain.render(data), "engine output differs from pystache.render"
+    assert expected == TemplateEngine('base_template').render(data), "memoized output differs from pystache.render"
+
+    def render_cold():
+        return TemplateEngine('base_template').render(data)
+
+    warm_engine = TemplateEngine('base_template')
+    warm_engine.render(data)
+
+    edits = [0]
+
+    def render_changed():
+        edits[0] += 1
+        for service in services[:args.changed]:
+            service['symbol'] = f"X{edits[0] % 100}"
+        return warm_engine.render(data)
+
+    before = per_call(render_before, args.rounds)
+    after = per_call(lambda: plain.render(data), args.rounds)
+    cold = per_call(render_cold, args.rounds)
+    warm = per_call(lambda: warm_engine.render(data), args.rounds)
+    changed = per_call(render_changed, args.rounds)
+
+    print(f"Services per source:          {args.services}")
+    print(f"Before (read+parse+render):   {before:8.2f} ms/source")
+    print(f"After  (render parsed):       {after:8.2f} ms/source")
+    print(f"Fragments, cold:              {cold:8.2f} ms/source (incl. engine load)")
+    print(f"Fragments, unchanged:         {warm:8.2f} ms/source")
+    print(f"Fragments, {args.changed:4d} changed:       {changed:8.2f} ms/source")
+    print(f"Engine load (once/container): {load_ms:8.2f} ms")
+    print(f"Speedup (parsed/unchanged):   {after / warm:8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
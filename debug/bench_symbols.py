@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Benchmark symbol allocation on synthetic service names: the old
+create_symbol() (shared dicts, nested candidate loop) against SymbolAllocator.
+
+Usage:
+  ./bench_symbols.py                      # 100, 1000, 5000 and 10000 names
+  ./bench_symbols.py --sizes 300 20000
+  ./bench_symbols.py --rounds 9           # best of 9 timings per size (default 5)
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+debug_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(debug_dir, '..', 'periodic'))
+sys.path.insert(0, debug_dir)
+
+import fixtures
+from symbols import SymbolAllocator, reserved_symbols
+
+
+def synthetic_names(count, seed=42):
+    """Service names as the allocator sees them: no prefix, the reserved names first."""
+    return fixtures.synthetic_names(count, seed, known=list(reserved_symbols.values()), prefixes=())
+
+
+def create_symbol_before(symbols, name, reserved_services):
+    """create_symbol() as it was before SymbolAllocator (reserved_services passed in)."""
+    symbol = ""
+    if name in reserved_services:
+      # We have a specific symbol to use for this service
+      symbol = reserved_services[name]
+      symbols[symbol] = name
+    else:
+      cleaned = re.sub(r"[&,-/.]", '', name)
+      words = cleaned.split(' ')
+      words = [ elem for elem in words if not elem.islower() ]
+
+      # Build candidate character pool from words
+      initials = [ w[0:1] for w in words if w ]
+      tails = [ w[1:] for w in words if len(w) > 1 ]
+      chars = "".join(initials + tails)
+
+      # Primary strategy: combine first char with following chars from pool
+      for idx, first in enumerate(chars):
+        first_up = first.upper()
+        # prefer combining with subsequent chars
+        for char in chars[idx+1:]:
+          candidate = first_up + char.lower()
+          if candidate not in symbols:
+            symbols[candidate] = name
+            reserved_services[name] = candidate
+            symbol = candidate
+            break
+        if symbol:
+          break
+
+      # Fallback for very short names, e.g., "Q": allow single-letter or synthesize pairs
+      if not symbol and chars:
+        first_up = chars[0].upper()
+        # Try single-letter if free
+        if first_up not in symbols:
+          symbols[first_up] = name
+          reserved_services[name] = first_up
+          symbol = first_up
+        else:
+          # Try first letter + a fallback sequence
+          for suf in list('abcdefghijklmnopqrstuvwxyz') + list('ABCDEFGHIJKLMNOPQRSTUVWXYZ') + ['1','2','3']:
+            candidate = first_up + suf
+            if candidate not in symbols:
+              symbols[candidate] = name
+              reserved_services[name] = candidate
+              symbol = candidate
+              break
+
+    if not symbol:
+      print("Couldn't generate symbol for %s: %s" % (name, chars if 'chars' in locals() else name))
+
+    return symbol
+
+
+def run_before(names):
+    symbols, reserved = {}, dict(map(reversed, reserved_symbols.items()))
+    return [create_symbol_before(symbols, name, reserved) for name in names]
+
+
+def run_after(names, registry=None):
+    allocator = SymbolAllocator(registry=registry)
+    return [allocator.allocate(name) for name in names], allocator
+
+
+def interleaved_names(size):
+    """Synthetic names with the reserved ones spread among them instead of first."""
+    names = synthetic_names(size)
+    reserved = names[:len(reserved_symbols)]
+    others = names[len(reserved):]
+    step = max(1, len(others) // len(reserved))
+    for i, name in enumerate(reserved):
+        others.insert(min(len(others), (i + 1) * step + i), name)
+    return others
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 5000, 10000])
+    parser.add_argument('--rounds', type=int, default=5, help='timings per size, the best one is reported')
+    args = parser.parse_args()
+
+    stdout = sys.stdout
+    print(f"{'names':>7} {'before ms':>10} {'after ms':>10} {'unassigned before':>18} {'unassigned after':>17} "
+          f"{'duplicates before':>18} {'stable w/ registry':>19} {'first run = before':>19} {'moved on 2nd run':>17}")
+    for size in args.sizes:
+        names = synthetic_names(size)
+        sys.stdout = open(os.devnull, 'w')  # silence "Couldn't generate symbol" lines
+        try:
+            before_ms = after_ms = float('inf')
+            for _ in range(max(1, args.rounds)):
+                started = time.perf_counter()
+                before = run_before(names)
+                before_ms = min(before_ms, (time.perf_counter() - started) * 1000)
+                started = time.perf_counter()
+                after, allocator = run_after(names)
+                after_ms = min(after_ms, (time.perf_counter() - started) * 1000)
+
+            # Next month: a few services are added up front; registry keeps the rest stable
+            shifted = synthetic_names(size + 20, seed=7)[-20:] + names
+            again, _ = run_after(shifted, registry=allocator.registry_snapshot())
+
+            # First run (no registry) with reserved names in between: same symbols as
+            # before wherever before assigned one; the run after it only moves the
+            # names that had taken a reserved symbol
+            mixed = interleaved_names(size)
+            mixed_before = run_before(mixed)
+            first, seeded = run_after(mixed)
+            second, _ = run_after(mixed, registry=seeded.registry_snapshot())
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+        stable = sum(1 for old, new in zip(after, again[20:]) if old == new) / size * 100
+        duplicates = len(before) - len(set(s for s in before if s)) - before.count('')
+        same = sum(1 for old, new in zip(mixed_before, first) if old == new or not old) / size * 100
+        moved = sum(1 for old, new in zip(first, second) if old != new)
+        print(f"{size:>7} {before_ms:>10.2f} {after_ms:>10.2f} {before.count(''):>18} {after.count(''):>17} "
+              f"{duplicates:>18} {stable:>18.1f}% {same:>18.1f}% {moved:>17}")
+
+
+if __name__ == '__main__':
+    main()
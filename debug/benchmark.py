@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark of every pipeline stage, per data source.
+
+Runs against the recorded fixtures in debug/fixtures/ (see fixtures.py
+--record) and synthetic fixtures scaled to the requested service counts.
+Every stage is timed separately (median of --rounds runs) and its peak
+allocation is measured with tracemalloc in one extra run:
+
+  fetch_parse  products page -> nav JSON / Directory API pages -> items
+  grouping     derive_category_name for every Directory API item
+  normalize    Directory API items -> service records (normalize_batches)
+  symbols      SymbolAllocator over all service names
+  source       get_data_from_<source>() end to end
+  positions    compute_positions
+  render       base template render
+  compress     page compression per encoding at the configured level
+  publish      S3Publisher to the in-memory stub bucket
+
+For every rendered page it also builds a compression level table: size,
+ratio and median time of each gzip and brotli level (brotli only when the
+library is installed). The PERIODIC_GZIP_LEVEL / PERIODIC_BROTLI_LEVEL
+defaults are picked from it.
+
+It also reports the cold-start import time of lambda_handler (from
+`python -X importtime`) next to the import time of the heavy dependencies
+it defers to the stages that use them.
+
+Results are written as JSON so runs can be compared:
+
+  ./benchmark.py                              # recorded (if any) + 1k, 5k, 20k
+  ./benchmark.py --sizes 1000 --rounds 3 -o before.json
+  ./benchmark.py --sizes 1000 --compare before.json
+"""
+import argparse
+import copy
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+invocation_dir = os.getcwd()
+debug_dir = os.path.dirname(os.path.abspath(__file__))
+periodic_dir = os.path.join(debug_dir, '..', 'periodic')
+os.chdir(periodic_dir)  # templates and partials are looked up relative to the cwd
+sys.path.insert(0, periodic_dir)
+sys.path.insert(0, debug_dir)
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+from fixtures import FixtureHTTP
+from s3_stub import StubS3
+
+import lambda_handler as lh
+from nav_extract import extract_nav_data
+from normalize import derive_category_name, normalize_batches, parse_name
+from precompress import DEFAULT_LEVELS, ENCODINGS, available, compress
+from publish import S3Publisher
+from source_cache import SourceCache
+from symbols import SymbolAllocator
+from template_engine import get_engine
+
+RESULTS_DIR = os.path.join(debug_dir, 'results')
+
+# Imported lazily by the handler; their cost only counts when a stage needs them
+DEFERRED_IMPORTS = ['boto3', 'requests', 'bs4', 'pystache', 'base64_images']
+
+
+def measure(fn, rounds):
+    """Median wall time (ms) over rounds runs, plus the peak allocation (KB) of one traced run."""
+    times = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - started) * 1000)
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, {'ms': round(statistics.median(times), 3), 'peak_kb': round(peak / 1024, 1)}
+
+
+def import_time(module):
+    """Cumulative import time (ms) of module in a fresh interpreter."""
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+                          cwd=periodic_dir, capture_output=True, text=True)
+    top_level = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented below the module that triggered them
+        if not name[1:].startswith(' '):
+            top_level.append((name.strip(), int(cumulative) / 1000))
+    return next((ms for name, ms in reversed(top_level) if name == module), None)
+
+
+def import_report():
+    report = {}
+    total = import_time('lambda_handler')
+    report['lambda_handler'] = {'ms': total}
+    print(f"Cold start: import lambda_handler {total:.1f} ms")
+    for module in DEFERRED_IMPORTS:
+        ms = import_time(module)
+        report[module] = {'ms': ms}
+        print(f"  deferred: import {module:<14} {ms:8.1f} ms" if ms is not None else f"  deferred: {module} not importable")
+    return report
+
+
+def level_table(body, rounds):
+    """Size, ratio and median time (ms) of every level of every available encoding."""
+    table = {}
+    for name, encoding in ENCODINGS.items():
+        if not available(name):
+            continue
+        table[name] = {}
+        for level in encoding.levels:
+            times = []
+            for _ in range(rounds):
+                started = time.perf_counter()
+                compressed = compress(body, name, level)
+                times.append((time.perf_counter() - started) * 1000)
+            table[name][level] = {'bytes': len(compressed), 'ratio': round(len(body) / len(compressed), 2),
+                                  'ms': round(statistics.median(times), 3)}
+    return table
+
+
+def print_level_table(table):
+    for name, levels in table.items():
+        print(f"  {name} levels (default {DEFAULT_LEVELS[name]}):")
+        for level, values in levels.items():
+            print(f"    {level:>2}  {values['bytes'] / 1024:>9.1f} KB  {values['ratio']:>6.2f}x  {values['ms']:>9.2f} ms")
+
+
+def render_context(periodic, source):
+    context = dict(periodic)
+    context['data_sources'] = [{'filename': f"index_{s}.html", 'label': s, 'active': s == source}
+                               for s in lh.SUPPORTED_SOURCES]
+    context.update(lh.image_context(False))
+    context.update(lh.style_context(context, False))
+    context['last_update'] = 'January 01, 2025'
+    return context
+
+
+def bench_source(http, source, rounds, levels=True):
+    stages = {}
+    if source == 'directory':
+        _, stages['fetch_parse'] = measure(
+            lambda: [it for page in lh.fetch_directory_pages(SourceCache()) for it in page], rounds)
+        items = http.directory.get('items', [])
+        _, stages['grouping'] = measure(lambda: [derive_category_name(it) for it in items], rounds)
+        _, stages['normalize'] = measure(lambda: list(normalize_batches([items])), rounds)
+    else:
+        _, stages['fetch_parse'] = measure(lambda: extract_nav_data(http.get('https://aws.amazon.com/products/').content), rounds)
+
+    periodic, stages['source'] = measure(lambda: lh.SOURCE_FETCHERS[source](SourceCache()), rounds)
+    names = [parse_name(service['name'])[1] for cat in periodic['categories'] for service in cat['services']]
+
+    def allocate():
+        symbols = SymbolAllocator()
+        return [symbols.allocate(name) for name in names]
+    _, stages['symbols'] = measure(allocate, rounds)
+
+    periodic = copy.deepcopy(periodic)
+    periodic, stages['positions'] = measure(lambda: lh.compute_positions(periodic), rounds)
+
+    engine = get_engine('base_template')
+    context = render_context(periodic, source)
+    html, stages['render'] = measure(lambda: engine.render(context), rounds)
+    body = html.encode('utf-8')
+    compressed, stages['compress'] = measure(lambda: compress(body, 'gzip'), rounds)
+    if available('br'):
+        _, stages['compress_br'] = measure(lambda: compress(body, 'br'), rounds)
+
+    pages = {f"index_{source}.html": html}
+    _, stages['publish'] = measure(lambda: S3Publisher(StubS3(), 'benchmark').publish(pages, {}), rounds)
+
+    services = sum(len(cat['services']) for cat in periodic['categories'])
+    return {'fixture': http.name, 'synthetic': http.synthetic_input, 'source': source, 'services': services,
+            'html_bytes': len(body), 'gzip_bytes': len(compressed), 'stages': stages,
+            'levels': level_table(body, rounds) if levels else None}
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {(r['fixture'], r['source']): r for r in json.load(f)['results']}
+    print(f"\nCompared with {baseline_path} (ms, new/old):")
+    for result in results:
+        old = baseline.get((result['fixture'], result['source']))
+        if not old:
+            continue
+        print(f"  {result['fixture']} / {result['source']}")
+        for stage, new in result['stages'].items():
+            before = old['stages'].get(stage)
+            if before and before['ms']:
+                print(f"    {stage:<12} {before['ms']:>10.2f} -> {new['ms']:>10.2f}  ({new['ms'] / before['ms']:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='*', default=[1000, 5000, 20000],
+                        help='Synthetic fixture sizes in services (default: 1000 5000 20000)')
+    parser.add_argument('--sources', nargs='+', default=['scrape', 'directory'], choices=['scrape', 'directory'])
+    parser.add_argument('--rounds', type=int, default=5, help='Timed runs per stage (default: 5)')
+    parser.add_argument('--no-recorded', action='store_true', help='Skip the recorded fixtures')
+    parser.add_argument('-o', '--output', help='Result file (default: debug/results/benchmark-<timestamp>.json)')
+    parser.add_argument('--compare', metavar='RESULTS', help='Print per-stage ratios against an earlier result file')
+    parser.add_argument('--no-imports', action='store_true', help='Skip the import-time report')
+    parser.add_argument('--no-levels', action='store_true', help='Skip the compression level table')
+    args = parser.parse_args()
+
+    imports = None if args.no_imports else import_report()
+
+    fixtures = []
+    if not args.no_recorded:
+        try:
+            fixtures.append(FixtureHTTP.recorded())
+        except FileNotFoundError:
+            print("WARNING: no recorded fixtures in debug/fixtures/ (run ./fixtures.py --record with network "
+                  "access), benchmarking SYNTHETIC input only")
+    fixtures.extend(FixtureHTTP.synthetic(size) for size in args.sizes)
+
+    results = []
+    stdout = sys.stdout
+    for http in fixtures:
+        http.install(lh)
+        for source in args.sources:
+            sys.stdout = open(os.devnull, 'w')  # silence the handler's progress output
+            try:
+                result = bench_source(http, source, args.rounds, levels=not args.no_levels)
+            finally:
+                sys.stdout.close()
+                sys.stdout = stdout
+            results.append(result)
+            print(f"{result['fixture']} / {source}: {result['services']} services, "
+                  f"{result['html_bytes'] / 1024:.0f} KB html, {result['gzip_bytes'] / 1024:.0f} KB gzip")
+            for stage, values in result['stages'].items():
+                print(f"  {stage:<12} {values['ms']:>10.2f} ms {values['peak_kb']:>10.0f} KB peak")
+            if result['levels']:
+                print_level_table(result['levels'])
+
+    if args.output:
+        output = os.path.join(invocation_dir, args.output)
+    else:
+        output = os.path.join(RESULTS_DIR, f"benchmark-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({'created': datetime.now().isoformat(timespec='seconds'),
+                   'synthetic_only': all(result['synthetic'] for result in results),
+                   'python': platform.python_version(),
+                   'rounds': args.rounds,
+                   'imports': imports,
+                   'results': results}, f, indent=2)
+    print(f"\nResults written to {output}")
+    if all(result['synthetic'] for result in results):
+        print("Note: every result above was measured on SYNTHETIC input, not on the real products page "
+              "or Directory API responses")
+
+    if args.compare:
+        compare(results, os.path.join(invocation_dir, args.compare))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,25 @@
 #!/usr/bin/env python3
+import os
+import sys
 from bs4 import BeautifulSoup
-from requests import get
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'periodic'))
+from http_client import get
+from nav_extract import NAV_MARKER, extract_nav_data, find_products_menu
 
 raw = get('https://aws.amazon.com/products/')
+
+print("=== Checking embedded globalNav JSON ===")
+print(f"Marker {NAV_MARKER!r} found: {NAV_MARKER.encode() in raw.content}")
+products_menu = find_products_menu(extract_nav_data(raw.content))
+if products_menu:
+    print(f"Products menu with {len(products_menu.get('subNav', []))} categories")
+else:
+    print("No Products menu in globalNav data")
+
 soup = BeautifulSoup(raw.content, 'html.parser')
 
-print("=== Checking for div.lb-item-wrapper ===")
+print("\n=== Checking for div.lb-item-wrapper ===")
 items = soup.select("div.lb-item-wrapper")
 print(f"Found {len(items)} items")
 
@@ -4,13 +4,18 @@ Fetch all AWS services from the AWS Price List API
 This provides a more complete list than the navigation menu
 """
 import json
-import requests
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'periodic'))
+from http_client import get
 
 # AWS Price List Service API
 url = "https://pricing.us-east-1.amazonaws.com/offers/v1.0/aws/index.json"
 
 print("Fetching AWS services from Price List API...")
-response = requests.get(url)
+response = get(url, timeout=30)
+response.raise_for_status()
 data = response.json()
 
 services = []
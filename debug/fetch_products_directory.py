@@ -25,11 +25,15 @@ Notes:
 """
 import argparse
 import json
+import os
 import sys
 from typing import Dict, List
 
 import requests
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "periodic"))
+from http_client import get
+
 AWS_PRODUCTS_API = (
     "https://aws.amazon.com/api/dirs/items/search"
     "?item.directoryId=products-cards-interactive-aws-products-ams"
@@ -47,7 +51,7 @@ MERGED_JSON = "merged_all_aws_services.json"
 
 
 def fetch_products() -> List[Dict]:
-    resp = requests.get(AWS_PRODUCTS_API, timeout=30)
+    resp = get(AWS_PRODUCTS_API, timeout=30)
     resp.raise_for_status()
     data = resp.json()
 
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Offline fixtures for the products page and the Directory API.
+
+Recorded fixtures are real responses saved to debug/fixtures/ with --record
+(products.html and directory.json, the latter holding all Directory API items
+in one document). Synthetic fixtures are generated on the fly in the same
+shape and can be scaled to any number of services.
+
+FixtureHTTP serves either kind through the same get(url, headers=..., ...)
+interface as requests, so lambda_handler runs unchanged without network:
+
+  http = FixtureHTTP.load()            # recorded if present, else synthetic
+  http = FixtureHTTP.synthetic(5000)
+  http.install(lambda_handler)
+
+The benchmarks draw their synthetic input from here too: synthetic_names()
+for symbol allocation and synthetic_periodic() for rendering.
+
+Usage:
+  ./fixtures.py --record                # download the live responses
+"""
+import argparse
+import json
+import os
+import random
+from urllib.parse import parse_qsl, urlparse
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+PRODUCTS_FIXTURE = os.path.join(FIXTURE_DIR, 'products.html')
+DIRECTORY_FIXTURE = os.path.join(FIXTURE_DIR, 'directory.json')
+
+CATEGORIES = ['Analytics', 'Compute', 'Storage', 'Databases', 'Networking & Content Delivery',
+              'Artificial Intelligence (AI)', 'Security, Identity, & Compliance', 'Developer Tools',
+              'Management & Governance', 'Application Integration', 'Media Services',
+              'Internet of Things', 'Migration', 'End-User Computing (EUC)', 'Business Applications',
+              'Game Tech', 'Quantum Technologies', 'Cloud Financial Management']
+
+WORDS = ['Elastic', 'Cloud', 'Data', 'Stream', 'Quantum', 'Insight', 'Guard', 'Pipe', 'Lake', 'Store',
+         'Sync', 'Mesh', 'Forge', 'Edge', 'Vault', 'Pulse', 'Kinesis', 'Bedrock', 'Route', 'Connect',
+         'for', 'and', 'on', 'Q', 'IoT', 'Managed', 'Service', 'Studio', 'Builder', 'Center', 'Gateway']
+
+# A few real names so reserved symbols and name cleanup are exercised
+KNOWN_NAMES = ['Amazon Simple Storage Service (S3)', 'AWS Lambda', 'Amazon EC2', 'Amazon Athena',
+               'AWS X-Ray', 'Amazon Route 53', 'Amazon Elastic Container Service for Kubernetes',
+               'AWS Cloud9', 'Amazon Macie', 'AWS Fargate']
+
+
+def synthetic_names(count, seed=42, known=KNOWN_NAMES, prefixes=('AWS', 'Amazon')):
+    """count unique, realistic-looking service names, starting with known (no prefix if prefixes is empty)."""
+    rng = random.Random(seed)
+    names = list(known[:count])
+    seen = set(names)
+    while len(names) < count:
+        name = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 4)))
+        if prefixes:
+            name = f"{rng.choice(prefixes)} {name}"
+        if name in seen:
+            name = f"{name} {len(names)}"
+        seen.add(name)
+        names.append(name)
+    return names
+
+
+def synthetic_directory(count, seed=42):
+    """A Directory API result ({'items': [...], 'metadata': {...}}) with count services."""
+    items = []
+    for i, name in enumerate(synthetic_names(count, seed)):
+        slug = name.lower().replace(' ', '-')
+        items.append({
+            'item': {'name': slug, 'additionalFields': {
+                'title': name,
+                'body': f"<p>{name} lets you <b>build</b> things &amp; run them at any scale.</p>",
+                'ctaLink': f"https://aws.amazon.com/{slug}/",
+            }},
+            'tags': [{'tagNamespaceId': 'GLOBAL#aws-technology-categories',
+                      'name': CATEGORIES[i % len(CATEGORIES)]}],
+        })
+    return {'items': items, 'metadata': {'count': len(items), 'totalHits': len(items)}}
+
+
+def synthetic_products_page(count, seed=42, padding=5000):
+    """A products page shaped like the real one: lots of markup around a large globalNav script."""
+    names = synthetic_names(count, seed)
+    sub_nav = [{'name': 'Featured Products', 'columns': []}]
+    for c, category in enumerate(CATEGORIES):
+        items = [{'title': name, 'hyperLink': f"https://aws.amazon.com/{name.lower().replace(' ', '-')}/",
+                  'body': 'Managed {service} with "quotes" and {braces}'}
+                 for name in names[c::len(CATEGORIES)]]
+        sub_nav.append({'name': category, 'columns': [{'items': items[:len(items) // 2]},
+                                                      {'sections': [{'items': items[len(items) // 2:]}]}]})
+    nav = {'items': [{'name': 'Products', 'subNav': sub_nav}]}
+    payload = json.dumps({'data': {'items': [{'fields': {'globalNav': json.dumps(nav)}}]}}, separators=(',', ':'))
+    markup = ''.join(f'<div class="lb-col"><a href="/p{i}">Product {i}</a><p>Text {i}</p></div>' for i in range(padding))
+    return (f'<html><head><script>var cfg={{"a":1}};</script></head><body>{markup}'
+            f'<script>window.globalNav={payload};</script>{markup}</body></html>').encode('utf-8')
+
+
+def synthetic_periodic(count, seed=42):
+    """Template data of one source with count services, ready for layout placement."""
+    periodic = {'categories': [], 'title': "Periodic Table of Amazon Web Services",
+                'description': "Synthetic benchmark data",
+                'data_sources': [{'filename': 'index_scrape.html', 'label': 'Web Scraping', 'active': True},
+                                 {'filename': 'index_directory.html', 'label': 'Directory API', 'active': False}],
+                'logo_url': 'img/logo.png', 'favicon_url': 'img/favicon.png',
+                'last_update': 'January 01, 2025'}
+    for c, category in enumerate(CATEGORIES):
+        periodic['categories'].append({'name': category, 'class': f"Category{c}",
+                                       'color': '#834187', 'services': []})
+    for i, full_name in enumerate(synthetic_names(count, seed)):
+        prefix, name = full_name.split(' ', 1)
+        cat = periodic['categories'][i % len(CATEGORIES)]
+        cat['services'].append({'name': name, 'symbol': f"S{i % 26}", 'prefix': prefix,
+                                'link': f"https://aws.amazon.com/{i}/", 'category': cat['class'],
+                                'long': len(name) > 11, 'reallong': len(name) > 20})
+    return periodic
+
+
+class FixtureResponse:
+    """The parts of requests.Response the handler and SourceCache use."""
+
+    def __init__(self, content, status_code=200):
+        self.content = content
+        self.status_code = status_code
+        self.headers = {}
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8')
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise Exception(f"HTTP {self.status_code}")
+
+
+class FixtureHTTP:
+    """
+    Serve the products page and paged Directory API results from memory.
+
+    Args:
+        products_page: bytes of the products page
+        directory: Directory API document with all items
+        name: label used in benchmark results
+    """
+
+    def __init__(self, products_page, directory, name):
+        self.products_page = products_page
+        self.directory = directory
+        self.name = name
+        self.requests = 0
+
+    @property
+    def synthetic_input(self):
+        """True for generated data: timings and sizes are not those of the real pages."""
+        return self.name != 'recorded'
+
+    @classmethod
+    def synthetic(cls, count, seed=42):
+        return cls(synthetic_products_page(count, seed), synthetic_directory(count, seed), f"synthetic-{count}")
+
+    @classmethod
+    def recorded(cls):
+        with open(PRODUCTS_FIXTURE, 'rb') as f:
+            page = f.read()
+        with open(DIRECTORY_FIXTURE, encoding='utf-8') as f:
+            directory = json.load(f)
+        return cls(page, directory, 'recorded')
+
+    @classmethod
+    def load(cls, synthetic_count=300):
+        """Recorded fixtures when available, synthetic ones otherwise."""
+        if os.path.exists(PRODUCTS_FIXTURE) and os.path.exists(DIRECTORY_FIXTURE):
+            return cls.recorded()
+        return cls.synthetic(synthetic_count)
+
+    @property
+    def services(self):
+        return len(self.directory.get('items', []))
+
+    def get(self, url, headers=None, **kwargs):
+        self.requests += 1
+        parsed = urlparse(url)
+        if parsed.path.startswith('/api/dirs/items/search'):
+            query = dict(parse_qsl(parsed.query))
+            size, page = int(query.get('size', 100)), int(query.get('page', 0))
+            items = self.directory.get('items', [])
+            body = {'items': items[page * size:(page + 1) * size],
+                    'metadata': {'count': len(items), 'totalHits': len(items)}}
+            return FixtureResponse(json.dumps(body).encode('utf-8'))
+        if parsed.path.startswith('/products'):
+            return FixtureResponse(self.products_page)
+        return FixtureResponse(b'', 404)
+
+    def install(self, handler_module):
+        """Route the handler's HTTP calls to the fixtures."""
+        handler_module.get = self.get
+
+
+def record():
+    """Download the live products page and all Directory API items into FIXTURE_DIR."""
+    import sys
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'periodic'))
+    from http_client import get
+    from lambda_handler import AWS_PRODUCTS_API, HEADERS
+
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    page = get('https://aws.amazon.com/products/', headers=HEADERS, timeout=30)
+    page.raise_for_status()
+    with open(PRODUCTS_FIXTURE, 'wb') as f:
+        f.write(page.content)
+
+    items, size, page_no, total = [], 100, 0, None
+    while total is None or page_no * size < total:
+        resp = get(f"{AWS_PRODUCTS_API}&size={size}&page={page_no}", headers=HEADERS, timeout=30)
+        resp.raise_for_status()
+        data = resp.json()
+        items.extend(data.get('items', []))
+        total = data.get('metadata', {}).get('totalHits', 0)
+        page_no += 1
+    with open(DIRECTORY_FIXTURE, 'w', encoding='utf-8') as f:
+        json.dump({'items': items, 'metadata': {'count': len(items), 'totalHits': len(items)}}, f)
+    print(f"Recorded {PRODUCTS_FIXTURE} ({len(page.content) / 1024:.0f} KB) "
+          f"and {DIRECTORY_FIXTURE} ({len(items)} items)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--record', action='store_true', help='Download the live responses into debug/fixtures/')
+    if parser.parse_args().record:
+        record()
+    else:
+        parser.print_help()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+In-memory stand-in for the boto3 S3 client calls used by the Lambda
+(put_object, upload_fileobj, get_object, head_object, copy_object,
+delete_object). Lets the publish stage
+and the S3-backed caches run locally without AWS credentials.
+"""
+import io
+
+from botocore.exceptions import ClientError
+
+
+class StubS3:
+    class exceptions:
+        class NoSuchKey(Exception):
+            pass
+
+    def __init__(self):
+        self.objects = {}
+        self.calls = []
+
+    def _missing(self, operation):
+        return ClientError({'Error': {'Code': '404', 'Message': 'Not Found'}}, operation)
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.calls.append(('put_object', Key))
+        if hasattr(Body, 'read'):
+            Body = Body.read()
+        self.objects[(Bucket, Key)] = {'Body': bytes(Body), **kwargs}
+        return {}
+
+    def upload_fileobj(self, Fileobj, Bucket, Key, ExtraArgs=None):
+        self.calls.append(('upload_fileobj', Key))
+        self.objects[(Bucket, Key)] = {'Body': Fileobj.read(), **(ExtraArgs or {})}
+
+    def get_object(self, Bucket, Key):
+        self.calls.append(('get_object', Key))
+        if (Bucket, Key) not in self.objects:
+            raise self.exceptions.NoSuchKey(Key)
+        obj = self.objects[(Bucket, Key)]
+        return {**obj, 'Body': io.BytesIO(obj['Body'])}
+
+    def head_object(self, Bucket, Key):
+        self.calls.append(('head_object', Key))
+        if (Bucket, Key) not in self.objects:
+            raise self._missing('HeadObject')
+        obj = self.objects[(Bucket, Key)]
+        return {k: v for k, v in obj.items() if k != 'Body'}
+
+    def copy_object(self, CopySource, Bucket, Key, MetadataDirective='COPY', **kwargs):
+        self.calls.append(('copy_object', Key))
+        source = (CopySource['Bucket'], CopySource['Key'])
+        if source not in self.objects:
+            raise self._missing('CopyObject')
+        obj = dict(self.objects[source]) if MetadataDirective == 'COPY' else {'Body': self.objects[source]['Body'], **kwargs}
+        self.objects[(Bucket, Key)] = obj
+        return {}
+
+    def delete_object(self, Bucket, Key):
+        self.calls.append(('delete_object', Key))
+        self.objects.pop((Bucket, Key), None)
+        return {}
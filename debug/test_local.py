@@ -1,54 +1,74 @@
 #!/usr/bin/env python3
 import os
+import sys
+import gzip
 import argparse
-import types
-from unittest.mock import MagicMock
 
-parser = argparse.ArgumentParser(description='Run periodic table generator locally and write output.html')
+parser = argparse.ArgumentParser(description='Run periodic table generator locally and write the generated pages to ../output/')
 parser.add_argument('--source', default=os.environ.get('PERIODIC_DATA_SOURCE', 'directory'), choices=['scrape','directory','merged'], help='Data source to use (default: directory)')
-parser.add_argument('--size', type=int, default=int(os.environ.get('PERIODIC_PRODUCTS_SIZE', '300')), help='Directory API size (default: 300)')
+parser.add_argument('--size', type=int, default=int(os.environ.get('PERIODIC_PRODUCTS_SIZE', '100')), help='Directory API page size (default: 100)')
+parser.add_argument('--force', action='store_true', help='Ignore the source cache and rebuild everything')
+parser.add_argument('--offline', action='store_true', help='Serve the sources from debug/fixtures/ (or synthetic data) instead of the network')
+parser.add_argument('--services', type=int, default=300, help='Services in the synthetic fixtures used by --offline without recordings (default: 300)')
 args = parser.parse_args()
 
-# Set env variables expected by periodic.py (must be set BEFORE loading it)
+# Set env variables expected by lambda_handler.py (must be set BEFORE importing it)
 os.environ.setdefault('bucket', 'test-bucket')
-os.environ.setdefault('key', 'test.html')
+os.environ.setdefault('key', 'index.html')
 os.environ['PERIODIC_DATA_SOURCE'] = args.source
 os.environ['PERIODIC_PRODUCTS_SIZE'] = str(args.size)
 
-# Work inside periodic directory so template path resolves
-os.chdir('../periodic')
-
-# Prepare mocked S3 client so the code writes to a local file instead of AWS
-mock_s3 = MagicMock()
-
-def save_html(**kwargs):
-    out_path = '../output.html'
-    print(f"Saving HTML to {out_path} (source={args.source}, size={args.size}) ...")
-    body = kwargs.get('Body', '')
-    if isinstance(body, bytes):
-        body = body.decode('utf-8', errors='ignore')
-    with open(out_path, 'w', encoding='utf-8') as f:
-        f.write(body)
-    print(f"Saved {len(body)} bytes")
-    return {}
+debug_dir = os.path.dirname(os.path.abspath(__file__))
+output_dir = os.path.join(debug_dir, '..', 'output')
 
-mock_s3.put_object = save_html
+# Local sink for the per-invocation metrics record (one JSON line per run)
+os.makedirs(output_dir, exist_ok=True)
+os.environ.setdefault('PERIODIC_METRICS_FILE', os.path.abspath(os.path.join(output_dir, 'metrics.jsonl')))
+# Memory peaks per stage (off in Lambda, tracemalloc slows the run down)
+os.environ.setdefault('PERIODIC_TRACE_MEMORY', '1')
+
+# Work inside periodic directory so template path resolves
+os.chdir(os.path.join(debug_dir, '..', 'periodic'))
+sys.path.insert(0, os.getcwd())
+sys.path.insert(0, debug_dir)
 
-# Load periodic.py as a module and override its S3 client
-with open('periodic.py', 'r', encoding='utf-8') as fh:
-    code = fh.read()
+from fixtures import FixtureHTTP
+from s3_stub import StubS3
+import lambda_handler
 
-module = types.ModuleType('periodic')
-module.__file__ = os.path.abspath('periodic.py')
-exec(code, module.__dict__)
+# Replace the S3 client with the in-memory stand-in so nothing goes to AWS
+stub = StubS3()
+lambda_handler.s3 = stub
 
-# Replace S3 client in the loaded module
-module.s3 = mock_s3
+if args.offline:
+    http = FixtureHTTP.load(args.services)
+    http.install(lambda_handler)
+    print(f"Offline: serving {http.name} fixtures ({http.services} Directory API items)")
+    if http.synthetic_input:
+        print("WARNING: no recordings in debug/fixtures/ (run ./fixtures.py --record), "
+              "the pages are built from SYNTHETIC data")
 
 try:
-    module.lambda_handler({}, None)
-    print("\nSuccess! Open output.html in your browser.")
+    lambda_handler.lambda_handler({'force': args.force}, None)
 except Exception as e:
     print(f"\nError: {e}")
     import traceback
     traceback.print_exc()
+    sys.exit(1)
+
+# Write the pages and the assets they reference (img/, css/) the handler
+# published into the stub bucket; skip the source cache and .br variants
+os.makedirs(output_dir, exist_ok=True)
+for (bucket, key), obj in stub.objects.items():
+    if key.startswith(lambda_handler.CACHE_PREFIX) or key.endswith('.br'):
+        continue
+    body = obj['Body']
+    if obj.get('ContentEncoding') == 'gzip':
+        body = gzip.decompress(body)
+    out_path = os.path.join(output_dir, key)
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    with open(out_path, 'wb') as f:
+        f.write(body)
+    print(f"Saved {out_path} ({len(body)} bytes)")
+
+print("\nSuccess! Open output/index.html in your browser.")
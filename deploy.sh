@@ -44,6 +44,11 @@ OPTIONS:
     -i, --invoke                     Invoke Lambda after deployment (default: true)
     -n, --no-invoke                  Skip Lambda invocation
     -f, --force                      Force redeployment even if no changes
+    -R, --render-only                Rebuild the pages from the stored snapshots
+                                     after deployment (no source fetches; for
+                                     template/layout-only changes)
+    -S, --sources LIST               Only rebuild these sources after deployment
+                                     (comma-separated: scrape,directory,merged)
     -h, --help                       Show this help message
 
 EXAMPLES:
@@ -56,6 +61,9 @@ EXAMPLES:
     # Deployment ohne Lambda-Ausführung
     $0 -n
 
+    # Nur Template geändert: Seiten aus den Snapshots neu erzeugen
+    $0 -R
+
     # Override einzelne Werte
     $0 -r us-east-1 -l my-lambda-bucket -b my-website-bucket
 
@@ -96,6 +104,8 @@ OUTPUT_BUCKET="${OUTPUT_BUCKET:-}"
 CLOUDFRONT_ID="${CLOUDFRONT_ID:-}"
 FORCE=false
 INVOKE_LAMBDA=true
+INVOKE_MODE=refresh
+INVOKE_SOURCES=""
 
 # Parse command line arguments
 while [[ $# -gt 0 ]]; do
@@ -136,6 +146,14 @@ while [[ $# -gt 0 ]]; do
             FORCE=true
             shift
             ;;
+        -R|--render-only)
+            INVOKE_MODE=render
+            shift
+            ;;
+        -S|--sources)
+            INVOKE_SOURCES="$2"
+            shift 2
+            ;;
         -h|--help)
             usage
             ;;
@@ -196,6 +214,16 @@ if [ $? -ne 0 ]; then
     exit 1
 fi
 
+# Brotli is a C extension: replace the build for this machine with the wheel
+# for the Lambda runtime (python3.12, x86_64)
+pip install brotli==1.1.0 -t lib/ -q --upgrade --platform manylinux2014_x86_64 \
+    --implementation cp --python-version 3.12 --only-binary=:all:
+
+if [ $? -ne 0 ]; then
+    print_error "Failed to install brotli for the Lambda runtime"
+    exit 1
+fi
+
 cd ..
 print_info "Dependencies installed successfully"
 
@@ -259,9 +287,23 @@ if [ "$INVOKE_LAMBDA" = true ] && [ -n "$FUNCTION_NAME" ]; then
     echo ""
     print_info "Invoking Lambda function to generate HTML files..."
     
+    # force: re-render even if the data sources are unchanged (new code/templates);
+    # mode render (-R): rebuild from the stored snapshots without fetching;
+    # sources (-S): leave all other sources alone
+    if [ "$INVOKE_MODE" = render ]; then
+        INVOKE_PAYLOAD='{"mode": "render"'
+    else
+        INVOKE_PAYLOAD='{"force": true'
+    fi
+    if [ -n "$INVOKE_SOURCES" ]; then
+        INVOKE_PAYLOAD="$INVOKE_PAYLOAD, \"sources\": [\"${INVOKE_SOURCES//,/\", \"}\"]"
+    fi
+    INVOKE_PAYLOAD="$INVOKE_PAYLOAD}"
     aws lambda invoke \
         --function-name "$FUNCTION_NAME" \
         --region "$REGION" \
+        --cli-binary-format raw-in-base64-out \
+        --payload "$INVOKE_PAYLOAD" \
         --log-type Tail \
         --query 'LogResult' \
         --output text \
@@ -291,7 +333,7 @@ if [ -n "$CLOUDFRONT_ID" ]; then
     
     INVALIDATION_OUTPUT=$(aws cloudfront create-invalidation \
         --distribution-id "$CLOUDFRONT_ID" \
-        --paths "/index.html" "/index_scrape.html" "/index_directory.html" \
+        --paths "/" "/index*" \
         --query 'Invalidation.{Id:Id,Status:Status,CreateTime:CreateTime}' \
         --output table 2>&1)
     
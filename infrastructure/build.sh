@@ -5,5 +5,11 @@ stackname=$3
 bucket=$4
 key=$5
 
+# Dependencies go to periodic/lib (on the handler's sys.path); brotli is a C
+# extension, so it is replaced with the wheel for the Lambda runtime
+pip install -r periodic/requirements.txt -t periodic/lib -q || exit 1
+pip install brotli==1.1.0 -t periodic/lib -q --upgrade --platform manylinux2014_x86_64 \
+    --implementation cp --python-version 3.12 --only-binary=:all: || exit 1
+
 aws --region $region cloudformation package --template-file infrastructure/template.yaml --s3-bucket $lambdabucket --output-template-file infrastructure/package.yaml
 aws --region $region cloudformation deploy --template-file infrastructure/package.yaml --stack-name $stackname --capabilities CAPABILITY_IAM --parameter-overrides Bucket=$bucket Key=$key
@@ -26,7 +26,10 @@ aws s3 website s3://$BUCKET/ \
     --index-document $KEY \
     --region $REGION
 
-# Set bucket policy for public read
+# Set bucket policy for public read, except for the Lambda's state store
+# (PERIODIC_CACHE_PREFIX), which only principals of this account may read
+CACHE_PREFIX=${PERIODIC_CACHE_PREFIX:-_cache/}
+ACCOUNT=$(aws sts get-caller-identity --query Account --output text)
 cat > /tmp/bucket-policy.json <<EOF
 {
   "Version": "2012-10-17",
@@ -37,6 +40,16 @@ cat > /tmp/bucket-policy.json <<EOF
       "Principal": "*",
       "Action": "s3:GetObject",
       "Resource": "arn:aws:s3:::$BUCKET/*"
+    },
+    {
+      "Sid": "DenyPublicStateStore",
+      "Effect": "Deny",
+      "Principal": "*",
+      "Action": "s3:GetObject",
+      "Resource": "arn:aws:s3:::$BUCKET/$CACHE_PREFIX*",
+      "Condition": {
+        "StringNotEquals": {"aws:PrincipalAccount": "$ACCOUNT"}
+      }
     }
   ]
 }
@@ -0,0 +1,102 @@
+"""
+Static assets (logo, favicon, stylesheet) published as content-hashed objects.
+
+Pages reference the images by URL (img/<name>.<hash>.png) instead of inlining
+them as data URIs, so the image bytes are uploaded once, cached by browsers
+and CDNs for a year, and no longer inflate (and get re-gzipped with) every
+page. A changed image gets a new hash and therefore a new URL.
+
+The same goes for the static CSS (style.css -> css/style.<hash>.css). Only
+the rules that depend on the data (grid size, category colors) stay in an
+inline <style> block, rendered from inline_style.mustache; its SHA-256 goes
+into the page's Content-Security-Policy, so no other inline <style> runs.
+
+Inlining is still available as an opt-in (PERIODIC_INLINE_IMAGES=1) for
+self-contained HTML; only then is the large base64_images module imported
+and the stylesheet embedded in the inline block.
+"""
+import base64
+import hashlib
+import os
+from collections import namedtuple
+from functools import lru_cache
+
+from template_engine import get_engine
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+IMG_DIR = os.path.join(BASE_DIR, 'img')
+STYLESHEET = os.path.join(BASE_DIR, 'style.css')
+
+# Template variable -> image file in img/
+IMAGES = {
+    'logo_url': 'tecracer_logo_rakete.png',
+    'favicon_url': 'favicon.png',
+}
+
+ASSET_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+CONTENT_TYPES = {'.png': 'image/png', '.css': 'text/css', '.svg': 'image/svg+xml'}
+
+# path: relative URL / key below the output directory, e.g. img/favicon.1a2b3c4d5e6f.png
+Asset = namedtuple('Asset', 'path content_type data')
+
+
+def hashed_name(filename, data):
+    stem, ext = os.path.splitext(filename)
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+
+
+def data_uri(filename):
+    with open(os.path.join(IMG_DIR, filename), 'rb') as f:
+        data = f.read()
+    content_type = CONTENT_TYPES.get(os.path.splitext(filename)[1], 'application/octet-stream')
+    return f"data:{content_type};base64,{base64.b64encode(data).decode('ascii')}"
+
+
+@lru_cache(maxsize=None)
+def image_assets():
+    """Return {template variable: Asset} for all images, read and hashed once per container."""
+    assets = {}
+    for var, filename in IMAGES.items():
+        with open(os.path.join(IMG_DIR, filename), 'rb') as f:
+            data = f.read()
+        content_type = CONTENT_TYPES.get(os.path.splitext(filename)[1], 'application/octet-stream')
+        assets[var] = Asset(f"img/{hashed_name(filename, data)}", content_type, data)
+    return assets
+
+
+@lru_cache(maxsize=None)
+def stylesheet_asset():
+    with open(STYLESHEET, 'rb') as f:
+        data = f.read()
+    return Asset(f"css/{hashed_name(os.path.basename(STYLESHEET), data)}", CONTENT_TYPES['.css'], data)
+
+
+def static_assets():
+    """All content-hashed assets a page references: {template variable: Asset}."""
+    return {**image_assets(), 'stylesheet_url': stylesheet_asset()}
+
+
+def style_context(periodic, inline=False):
+    """
+    Template variables for the page styles: the stylesheet URL, the inline
+    block with the data-dependent rules (preceded by the whole stylesheet
+    when inline) and the CSP hash of that block.
+    """
+    inline_style = get_engine('inline_style').render(periodic)
+    if inline:
+        inline_style = stylesheet_asset().data.decode('utf-8') + inline_style
+    digest = hashlib.sha256(inline_style.encode('utf-8')).digest()
+    return {
+        'stylesheet_url': None if inline else stylesheet_asset().path,
+        'inline_style': inline_style,
+        'style_hash': base64.b64encode(digest).decode('ascii'),
+    }
+
+
+def image_context(inline=False):
+    """Template variables for the images: hashed URLs, or data URIs when inline."""
+    if inline:
+        from base64_images import LOGO_DATA_URI, FAVICON_DATA_URI
+        return {'logo_url': LOGO_DATA_URI, 'favicon_url': FAVICON_DATA_URI}
+    return {var: asset.path for var, asset in image_assets().items()}
@@ -1,32 +1,36 @@
 #!/usr/bin/env python3
-import base64
-from pathlib import Path
+"""
+Image asset pipeline for the images in img/.
 
-# Read the logo PNG image
-logo_path = Path('img/tecracer_logo_rakete.png')
-with open(logo_path, 'rb') as f:
-    logo_data = f.read()
+By default the Lambda publishes the images as content-hashed objects
+(img/<name>.<hash>.png, see assets.py) and pages reference them by URL. This
+script lists those hashed names and regenerates base64_images.py, which is
+only used for the opt-in inline mode (PERIODIC_INLINE_IMAGES=1).
+"""
+import os
 
-# Read the favicon PNG image
-favicon_path = Path('img/favicon.png')
-with open(favicon_path, 'rb') as f:
-    favicon_data = f.read()
+from assets import IMAGES, data_uri, image_assets
 
-# Create base64 encodings
-logo_base64 = base64.b64encode(logo_data).decode('utf-8')
-favicon_base64 = base64.b64encode(favicon_data).decode('utf-8')
+# Template variable -> constant name in base64_images.py
+CONSTANTS = {
+    'logo_url': 'LOGO_DATA_URI',
+    'favicon_url': 'FAVICON_DATA_URI',
+}
 
-# Create the Python file
-output = f'''# Base64-encoded images as data URIs
-LOGO_DATA_URI = "data:image/png;base64,{logo_base64}"
 
-FAVICON_DATA_URI = "data:image/png;base64,{favicon_base64}"
-'''
+def main():
+    lines = ["# Base64-encoded images as data URIs (only imported with PERIODIC_INLINE_IMAGES=1)"]
+    for var, filename in IMAGES.items():
+        lines.append(f'{CONSTANTS[var]} = "{data_uri(filename)}"')
 
-# Write to file
-with open('base64_images.py', 'w') as f:
-    f.write(output)
+    output = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'base64_images.py')
+    with open(output, 'w') as f:
+        f.write("\n\n".join(lines) + "\n")
 
-print("✓ Created base64_images.py with proper base64-encoded PNG data")
-print(f"✓ Logo size: {len(logo_base64)} characters")
-print(f"✓ Favicon size: {len(favicon_base64)} characters")
+    print("✓ Created base64_images.py for inline mode")
+    for var, asset in image_assets().items():
+        print(f"✓ {IMAGES[var]} -> {asset.path} ({len(asset.data)} bytes)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Time budget of one invocation.
+
+Lambda kills a function at its Timeout, possibly in the middle of an
+upload. Deadline reads the remaining time from the Lambda context once at
+the start and hands out budgets to the stages, always keeping RESERVE
+seconds free for committing the cache and emitting the metrics:
+
+- fetch: whatever is left after OUTPUT_RESERVE seconds for rendering and
+  publishing; a source that doesn't make it falls back to its last good
+  dataset (fallback.py), and no HTTP retry starts past it
+- output: the default page and index.html first, then the other pages as
+  long as the time left covers them (see lambda_handler.generate)
+
+Without a context (local runs) the budget is unlimited.
+"""
+import math
+import os
+import time
+
+RESERVE = float(os.environ.get('PERIODIC_DEADLINE_RESERVE', '3'))
+OUTPUT_RESERVE = float(os.environ.get('PERIODIC_OUTPUT_RESERVE', '15'))
+
+
+class Deadline:
+    """
+    Args:
+        remaining_ms: time left for the invocation, None for no limit
+        reserve: seconds kept free at the end
+    """
+
+    def __init__(self, remaining_ms=None, reserve=RESERVE):
+        self.end = None if remaining_ms is None else time.monotonic() + remaining_ms / 1000 - reserve
+
+    @classmethod
+    def from_context(cls, context):
+        remaining = getattr(context, 'get_remaining_time_in_millis', None)
+        return cls(remaining() if remaining else None)
+
+    @property
+    def limited(self):
+        return self.end is not None
+
+    def remaining(self):
+        """Seconds left (math.inf without a limit)."""
+        return math.inf if self.end is None else max(0.0, self.end - time.monotonic())
+
+    def budget(self, limit, keep=0):
+        """Seconds a stage may take: at most limit, leaving keep seconds for the stages after it."""
+        return max(0.0, min(limit, self.remaining() - keep))
+
+    def at(self, seconds):
+        """time.monotonic() value seconds from now, capped at the deadline (None without either)."""
+        if seconds is None or math.isinf(seconds):
+            return self.end
+        end = time.monotonic() + seconds
+        return end if self.end is None else min(end, self.end)
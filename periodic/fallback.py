@@ -0,0 +1,68 @@
+"""
+Last-known-good fallback for sources that fail.
+
+A source fails when its fetch raises, runs past its time budget
+(PERIODIC_FETCH_TIMEOUT, less when the invocation runs short, see deadline.py), or
+returns fewer than PERIODIC_MIN_SERVICES_RATIO times the services of its
+last good dataset (no services at all always counts as a failure). The
+handler then publishes the source from its snapshot (snapshots.py), which
+is only ever written for datasets that passed this check, and records the
+failure in the state store:
+
+  failures/<source>.json  {"source", "date", "reason", "services", "last_good"}
+
+The next run fetches a source with a recorded failure unconditionally
+instead of trusting 304s and dataset hashes, and clears the record once
+the source delivers a good dataset again.
+"""
+import os
+from datetime import datetime, timezone
+
+MIN_SERVICES_RATIO = float(os.environ.get('PERIODIC_MIN_SERVICES_RATIO', '0.8'))
+# Below the function's 60 s Timeout, so local runs (no deadline) behave like Lambda
+FETCH_TIMEOUT = float(os.environ.get('PERIODIC_FETCH_TIMEOUT', '40'))
+
+
+def _path(source):
+    return f"failures/{source}.json"
+
+
+def service_count(periodic):
+    return sum(len(category['services']) for category in (periodic or {}).get('categories', []))
+
+
+def check_dataset(periodic, last_good, ratio=MIN_SERVICES_RATIO):
+    """Why periodic is not usable compared to last_good (its snapshot), or None if it is."""
+    count = service_count(periodic)
+    if count == 0:
+        return "no services"
+    expected = service_count(last_good)
+    if expected and count < expected * ratio:
+        return f"{count} services, last good dataset has {expected} (threshold {ratio:.0%})"
+    return None
+
+
+def failed_sources(cache, sources):
+    """{source: failure record} of the sources whose last run failed."""
+    failures = {}
+    for source in sources:
+        failure = cache.load_json(_path(source))
+        if failure:
+            failures[source] = failure
+    return failures
+
+
+def record_failure(cache, source, reason, periodic=None, last_good=None):
+    """Stage the failure record of source (written on cache.commit())."""
+    cache.stage_json(_path(source), {
+        'source': source,
+        'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'reason': reason,
+        'services': service_count(periodic),
+        'last_good': service_count(last_good) if last_good is not None else None,
+    })
+
+
+def clear_failure(cache, source):
+    # A null document reads back as "no failure"
+    cache.stage_json(_path(source), None)
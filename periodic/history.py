@@ -0,0 +1,235 @@
+"""
+Dated history of the service catalogs and the changes between runs.
+
+Every run that changes a source stores a compact snapshot of its services in
+the state store, keyed by date:
+
+  history/<source>/<YYYY-MM-DD>.json  {"version", "source", "date", "services": [[name, symbol, category, link], ...]}
+  history/<source>/index.json         sorted list of the stored dates
+  history/<source>/changes.json       diff of the latest snapshot against the one before
+
+All of them are staged on the SourceCache and written after a successful
+publish. A second run on the same day replaces that day's snapshot. Dated
+snapshots older than PERIODIC_HISTORY_DAYS days are deleted (and dropped from
+the index) when a new one is recorded; the latest one before the retention
+window is kept as the baseline of the next diff.
+
+diff() matches services on their normalized name (merge.normalize_key), so
+both snapshots are indexed once in dicts and compared in a single pass each:
+linear in the number of services. Services whose names normalize to the same
+key are kept side by side and paired on name, link or category, so none of
+them hides another's addition or removal. A removed and an added
+service with the same link count as a rename.
+"""
+import os
+from collections import defaultdict
+from datetime import date, timedelta
+
+from merge import normalize_key
+
+HISTORY_VERSION = 1
+
+# Days dated snapshots are kept (0 keeps them forever)
+HISTORY_DAYS = int(os.environ.get('PERIODIC_HISTORY_DAYS', '400'))
+
+FIELDS = ('name', 'symbol', 'category', 'link')
+
+
+def _path(source, name):
+    return f"history/{source}/{name}.json"
+
+
+def service_rows(periodic):
+    """Compact [name, symbol, category, link] rows of a periodic dict."""
+    rows = []
+    for category in periodic.get('categories', []):
+        for service in category['services']:
+            name = f"{service.get('prefix', '')} {service['name']}".strip()
+            rows.append([name, service.get('symbol', ''), category['name'], service.get('link', '')])
+    return rows
+
+
+def _link_key(link):
+    return (link or '').split('#', 1)[0].split('?', 1)[0].rstrip('/').lower()
+
+
+def _entry(row):
+    return dict(zip(FIELDS, row))
+
+
+def _index(rows):
+    """Rows grouped by normalized name (a list, as several services may share a key)."""
+    index = defaultdict(list)
+    for row in rows:
+        index[normalize_key(row[0])].append(row)
+    return index
+
+
+def _pair(old_rows, new_rows):
+    """
+    Match the services sharing a key: on their exact name, then link, then
+    category, the rest in order.
+
+    Returns:
+        ([(old, new)], unmatched old rows, unmatched new rows)
+    """
+    if len(old_rows) == 1 and len(new_rows) == 1:
+        return [(old_rows[0], new_rows[0])], [], []
+    old_rows, new_rows = list(old_rows), list(new_rows)
+    pairs = []
+    for field in (0, 3, 2):
+        for row in list(new_rows):
+            old = next((old for old in old_rows if old[field] == row[field]), None)
+            if old is not None:
+                old_rows.remove(old)
+                new_rows.remove(row)
+                pairs.append((old, row))
+    matched = min(len(old_rows), len(new_rows))
+    pairs.extend(zip(old_rows[:matched], new_rows[:matched]))
+    return pairs, old_rows[matched:], new_rows[matched:]
+
+
+def diff(previous, current):
+    """
+    Changes between two lists of service rows.
+
+    Returns:
+        {'added': [service], 'removed': [service], 'renamed': [{'from', 'to', 'link'}],
+         'recategorized': [{'name', 'from', 'to'}], 'changed': [{'name', 'fields': {field: [old, new]}}]}
+    """
+    before = _index(previous)
+    after = _index(current)
+
+    changes = {'added': [], 'removed': [], 'renamed': [], 'recategorized': [], 'changed': []}
+    added = []
+    removed = []
+    for key, rows in after.items():
+        pairs, gone, new = _pair(before.get(key, ()), rows)
+        added.extend(new)
+        removed.extend(gone)
+        for old, row in pairs:
+            if old[2] != row[2]:
+                changes['recategorized'].append({'name': row[0], 'from': old[2], 'to': row[2]})
+            fields = {field: [old[i], row[i]] for i, field in enumerate(FIELDS) if i != 2 and old[i] != row[i]}
+            if fields:
+                changes['changed'].append({'name': row[0], 'fields': fields})
+    for key, rows in before.items():
+        if key not in after:
+            removed.extend(rows)
+
+    removed_by_link = {}
+    for row in removed:
+        link = _link_key(row[3])
+        if link and link not in removed_by_link:
+            removed_by_link[link] = row
+        else:
+            changes['removed'].append(_entry(row))
+
+    for row in added:
+        old = removed_by_link.pop(_link_key(row[3]), None) if row[3] else None
+        if old is not None:
+            changes['renamed'].append({'from': old[0], 'to': row[0], 'link': row[3]})
+        else:
+            changes['added'].append(_entry(row))
+    changes['removed'].extend(_entry(row) for row in removed_by_link.values())
+    return changes
+
+
+def summary(changes):
+    """Number of entries per kind of change (date fields are skipped)."""
+    return {kind: len(entries) for kind, entries in changes.items() if isinstance(entries, list)}
+
+
+class History:
+    """
+    History of one state store (SourceCache).
+
+    Args:
+        cache: SourceCache to read from and stage into
+        today: date of this run
+    """
+
+    def __init__(self, cache, today=None, days=HISTORY_DAYS):
+        self.cache = cache
+        today = today or date.today()
+        self.today = today.isoformat()
+        self.oldest = (today - timedelta(days=days)).isoformat() if days > 0 else None
+
+    def dates(self, source):
+        return self.cache.load_json(_path(source, 'index')) or []
+
+    def load(self, source, day):
+        """Rows of the snapshot of source on day, or None."""
+        snapshot = self.cache.load_json(_path(source, day))
+        if not snapshot or snapshot.get('version') != HISTORY_VERSION:
+            return None
+        return snapshot['services']
+
+    def latest_before(self, source, day):
+        """(date, rows) of the latest snapshot strictly before day, or (None, None)."""
+        earlier = [d for d in self.dates(source) if d < day]
+        for d in reversed(earlier):
+            rows = self.load(source, d)
+            if rows is not None:
+                return d, rows
+        return None, None
+
+    def record(self, source, periodic):
+        """
+        Stage today's snapshot of source and its diff against the previous
+        snapshot.
+
+        Returns:
+            the changes (with 'date' and 'previous'), or None on the first snapshot
+        """
+        rows = service_rows(periodic)
+        self.cache.stage_json(_path(source, self.today), {
+            'version': HISTORY_VERSION, 'source': source, 'date': self.today, 'services': rows})
+        dates = sorted(set(self.dates(source)) | {self.today})
+        self.cache.stage_json(_path(source, 'index'), self._prune(source, dates))
+
+        previous, previous_rows = self.latest_before(source, self.today)
+        if previous_rows is None:
+            return None
+        changes = {'date': self.today, 'previous': previous, **diff(previous_rows, rows)}
+        self.cache.stage_json(_path(source, 'changes'), changes)
+        return changes
+
+    def _prune(self, source, dates):
+        """Stage the deletion of the snapshots out of retention; returns the dates kept."""
+        if self.oldest is None:
+            return dates
+        expired = [d for d in dates if d < self.oldest]
+        # The newest expired snapshot stays: it is the baseline before the window
+        # (e.g. for new_this_month() and the diff after a long pause)
+        for d in expired[:-1]:
+            self.cache.stage_delete(_path(source, d))
+        return expired[-1:] + [d for d in dates if d >= self.oldest]
+
+    def latest_changes(self, source):
+        """The diff stored by the last run that changed source (None before the second snapshot)."""
+        return self.cache.load_json(_path(source, 'changes'))
+
+    def new_this_month(self, source, periodic):
+        """
+        Normalized names of the services of periodic added since the latest
+        snapshot from before this month (renames don't count; empty without
+        such a snapshot).
+        """
+        month_start = self.today[:8] + '01'
+        _, baseline = self.latest_before(source, month_start)
+        if baseline is None:
+            return set()
+        return {normalize_key(service['name']) for service in diff(baseline, service_rows(periodic))['added']}
+
+
+def mark_new(periodic, new_keys):
+    """Flag the services of periodic whose normalized name is in new_keys ({{#new}} in the template)."""
+    if not new_keys:
+        return periodic
+    for category in periodic['categories']:
+        for service in category['services']:
+            name = f"{service.get('prefix', '')} {service['name']}".strip()
+            if normalize_key(name) in new_keys:
+                service['new'] = True
+    return periodic
@@ -0,0 +1,102 @@
+"""
+Plain text from the HTML snippets in service descriptions.
+
+The sources deliver descriptions as raw text, partly with HTML markup
+(Directory API bodies). The fetchers keep them as they are; only when an
+output actually uses `desc` does materialize_descriptions() convert them,
+in one batch through a single reused html.parser instance instead of one
+BeautifulSoup tree per item. Identical snippets are converted once.
+
+The result matches BeautifulSoup(html, 'html.parser').get_text(" ", strip=True):
+text nodes (including CDATA) stripped and joined with single spaces, comments
+and script/style content left out, character references decoded.
+"""
+from html.parser import HTMLParser
+
+SKIPPED_TAGS = {'script', 'style', 'template'}
+
+
+def has_markup(text):
+    return isinstance(text, str) and '<' in text and '>' in text
+
+
+class _TextExtractor(HTMLParser):
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._begin()
+
+    def _begin(self):
+        self.parts = []
+        self.buffer = []
+        self.skipping = 0
+
+    def _flush(self):
+        # A text node ends at the next tag or comment; the parser may deliver it in pieces
+        text = ''.join(self.buffer).strip()
+        if text:
+            self.parts.append(text)
+        self.buffer = []
+
+    def handle_starttag(self, tag, attrs):
+        self._flush()
+        if tag in SKIPPED_TAGS:
+            self.skipping += 1
+
+    def handle_endtag(self, tag):
+        self._flush()
+        if tag in SKIPPED_TAGS and self.skipping:
+            self.skipping -= 1
+
+    def handle_comment(self, data):
+        self._flush()
+
+    def unknown_decl(self, data):
+        # <![CDATA[...]]> is a text node of its own
+        self._flush()
+        if data.startswith('CDATA[') and not self.skipping:
+            self.buffer.append(data[len('CDATA['):])
+            self._flush()
+
+    def handle_data(self, data):
+        if not self.skipping:
+            self.buffer.append(data)
+
+    def text(self, html):
+        self.reset()
+        self._begin()
+        self.feed(html)
+        self.close()
+        self._flush()
+        return ' '.join(self.parts)
+
+
+def strip_html_batch(snippets):
+    """Plain text of each snippet (snippets without markup are returned unchanged)."""
+    extractor = _TextExtractor()
+    converted = {}
+    result = []
+    for snippet in snippets:
+        if not has_markup(snippet):
+            result.append(snippet)
+            continue
+        text = converted.get(snippet)
+        if text is None:
+            try:
+                text = converted[snippet] = extractor.text(snippet)
+            except Exception:
+                text = snippet
+        result.append(text)
+    return result
+
+
+def materialize_descriptions(periodic):
+    """Replace the raw service descriptions of a periodic table with plain text, once."""
+    if periodic.get('desc_materialized'):
+        return periodic
+    services = [service for category in periodic['categories'] for service in category['services']
+                if has_markup(service.get('desc'))]
+    for service, text in zip(services, strip_html_batch([service['desc'] for service in services])):
+        service['desc'] = text
+    periodic['desc_materialized'] = True
+    return periodic
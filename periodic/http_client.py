@@ -0,0 +1,110 @@
+"""
+Shared HTTP client for all fetchers.
+
+One requests.Session per process, created on first use with a connection pool
+of PERIODIC_HTTP_POOL connections per host. On Lambda the module outlives the
+invocation, so warm invocations reuse the open keep-alive connections (no new
+TCP/TLS handshake), and the products page and the Directory API, both on
+aws.amazon.com, share them within a run.
+
+get() retries what is safe to repeat: connection errors, timeouts and the
+statuses in RETRY_STATUSES, up to PERIODIC_HTTP_RETRIES times, sleeping a
+random time between 0 and BACKOFF * 2**attempt seconds (exponential backoff
+with full jitter, capped at BACKOFF_MAX) or the server's Retry-After. Every
+call has a time budget (PERIODIC_HTTP_BUDGET seconds) covering all attempts
+and the sleeps between them; the read timeout of each attempt is cut to what
+is left of it, and no retry starts that can't finish within it. The handler
+also sets `deadline` for the whole invocation, which caps every budget.
+"""
+import os
+import random
+import time
+
+POOL_SIZE = int(os.environ.get('PERIODIC_HTTP_POOL', '8'))
+RETRIES = int(os.environ.get('PERIODIC_HTTP_RETRIES', '3'))
+BUDGET = float(os.environ.get('PERIODIC_HTTP_BUDGET', '60'))
+
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 20
+BACKOFF = 0.5
+BACKOFF_MAX = 8
+
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+
+session = None
+
+# time.monotonic() value no request may run past (set per invocation), or None
+deadline = None
+
+# Replaced in tests and benchmarks to skip the waits
+sleep = time.sleep
+
+
+def get_session():
+    """The process-wide pooled session (created on first use)."""
+    global session
+    if session is None:
+        from requests import Session
+        from requests.adapters import HTTPAdapter
+        session = Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE, max_retries=0)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+    return session
+
+
+def backoff(attempt, retry_after=None):
+    """Seconds to wait before retry number attempt (0-based)."""
+    if retry_after is not None:
+        return min(retry_after, BACKOFF_MAX)
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF * 2 ** attempt))
+
+
+def _retry_after(resp):
+    value = resp.headers.get('Retry-After', '')
+    return float(value) if value.strip().isdigit() else None
+
+
+def get(url, timeout=READ_TIMEOUT, retries=RETRIES, budget=BUDGET, **kwargs):
+    """
+    GET url through the pooled session, retrying transient failures.
+
+    Args:
+        timeout: read timeout of a single attempt in seconds
+        retries: retries after the first attempt
+        budget: seconds for all attempts and the waits between them
+
+    Returns:
+        the response of the last attempt (a retryable status is returned as
+        is once retries or budget run out; callers raise_for_status())
+    """
+    from requests import ConnectionError, Timeout
+    from metrics import current_metrics
+
+    end = time.monotonic() + budget
+    if deadline is not None:
+        end = min(end, deadline)
+    attempt = 0
+    while True:
+        remaining = max(end - time.monotonic(), 0.1)
+        try:
+            resp = get_session().get(url, timeout=(min(CONNECT_TIMEOUT, remaining), min(timeout, remaining)),
+                                     **kwargs)
+            if resp.status_code not in RETRY_STATUSES:
+                return resp
+            error, failure, wait = None, f"HTTP {resp.status_code}", backoff(attempt, _retry_after(resp))
+        except (ConnectionError, Timeout) as e:
+            resp = None
+            error, failure, wait = e, type(e).__name__, backoff(attempt)
+
+        if attempt >= retries or time.monotonic() + wait + CONNECT_TIMEOUT >= end:
+            if error is not None:
+                raise error
+            return resp
+        if resp is not None:
+            # Hand the connection back to the pool before waiting
+            resp.close()
+        attempt += 1
+        print(f"GET {url}: {failure}, retry {attempt}/{retries} in {wait:.1f} s")
+        current_metrics().add('http_retries', 1)
+        sleep(wait)
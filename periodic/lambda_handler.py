@@ -2,29 +2,52 @@ import os, sys
 # Add lib directory to path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'lib'))
 
-import re, json, boto3, pystache, gzip
+import json, math, time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout, as_completed
 from datetime import datetime
-from bs4 import BeautifulSoup
-from requests import get
 
-# Import embedded images
-from base64_images import LOGO_DATA_URI, FAVICON_DATA_URI
+from assets import image_context, static_assets, style_context
+from deadline import OUTPUT_RESERVE, Deadline
+from fallback import FETCH_TIMEOUT, check_dataset, clear_failure, failed_sources, record_failure, service_count
+from history import History, mark_new, summary
+from html_text import materialize_descriptions
+import http_client
+from http_client import get
+from layout import get_layout
+from merge import build_aliases, merge_catalogs
+from metrics import Metrics, current_metrics
+from nav_extract import extract_nav_data, find_products_menu
+from normalize import category_class, normalize_batches, parse_name
+from precompress import FAST_LEVELS, MIN_COMPRESS_SIZE, available
+from publish import LocalPublisher, S3Publisher
+from snapshots import load_snapshot, load_snapshots, save_snapshot
+from source_cache import SourceCache
+from storage import LocalStore, S3Store
+from symbols import SymbolAllocator, reserved_symbols
+from template_engine import get_engine
 
 # Optional: Wählen Sie Datenquelle und Verzeichnis-API-Größe über die Umgebung
-# Unterstützte Quellen: scrape, directory, merged (merged verhält sich derzeit wie directory)
-SUPPORTED_SOURCES = ['scrape', 'directory']
+# Unterstützte Quellen: scrape, directory, merged (Directory API + Scraping, optional Price List)
+SUPPORTED_SOURCES = ['scrape', 'directory', 'merged']
 DEFAULT_SOURCE = os.environ.get('PERIODIC_DATA_SOURCE', 'scrape')
 
-# AWS Products Directory endpoint template
+# AWS Products Directory endpoint template (page and size are appended per request)
 AWS_PRODUCTS_API = (
   "https://aws.amazon.com/api/dirs/items/search?"
   "item.directoryId=products-cards-interactive-aws-products-ams"
   "&item.locale=en_US"
   "&tags.id=GLOBAL%23local-tags-aws-products-type%23service%7CGLOBAL%23local-tags-aws-products-type%23feature"
   "&sort_by=item.dateCreated&sort_order=asc"
-  f"&size={int(os.environ.get('PERIODIC_PRODUCTS_SIZE', '300'))}"
 )
 
+# AWS Price List offer index, optionally joined into the merged source
+PRICE_LIST_URL = "https://pricing.us-east-1.amazonaws.com/offers/v1.0/aws/index.json"
+MERGE_PRICE_LIST = os.environ.get('PERIODIC_MERGE_PRICE_LIST', '') == '1'
+
+# Page size and number of parallel page requests for the Directory API
+PERIODIC_PRODUCTS_SIZE = int(os.environ.get('PERIODIC_PRODUCTS_SIZE', '100'))
+PERIODIC_DIRECTORY_WORKERS = int(os.environ.get('PERIODIC_DIRECTORY_WORKERS', '4'))
+
 # Common HTTP headers to mimic a browser (helps aws.com endpoints return full data)
 HEADERS = {
   'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
@@ -33,50 +56,50 @@ HEADERS = {
   'Referer': 'https://aws.amazon.com/products/',
 }
 
+# Heavy dependencies (requests, boto3, bs4, pystache) are imported by the stage
+# that needs them, not at cold start: a run without changes never renders, a
+# local run never talks to S3, and most descriptions contain no HTML.
+
+# Every fetch goes through http_client.get: one pooled session per container,
+# kept across warm invocations, with retries and backoff on transient errors.
+
 bucket = os.environ.get('bucket', '')
 key = os.environ.get('key', 'index.html')
 key_prefix = key.rsplit('.', 1)[0] if '.' in key else key
 
-# Initialisiere S3-Client
-s3 = boto3.client('s3')
-
-# Reserve keywords for special cases, including single and 3-letter symbols
-reserved_symbols = {
-  "Mx"  : "Apache MXNet on AWS",
-  "Tf"  : "TensorFlow on AWS",
-  "Eks" : "Elastic Container Service for Kubernetes",
-  "Ecs" : "Elastic Container Service",
-  "Db"  : "DocumentDB",
-  "53"  : "Route 53",
-  "X"   : "X-Ray",
-  "Ami" : "Deep Learning AMIs",
-  "Phd" : "Personal Health Dashboard",
-  "Cs"  : "CloudSearch",
-  "L"   : "Lambda",
-  "S3"  : "Simple Storage Service",
-  "A"   : "Athena",
-  "Vpc" : "VPC",
-  "Ec2" : "EC2",
-  "C9"  : "Cloud9",
-  "Gt"  : "SageMaker Ground Truth",
-  "Sns" : "Simple Notification Service",
-  "Sqs" : "Simple Queue Service",
-  "Hsm" : "CloudHSM",
-  "Ebs" : "Elastic Block Store",
-  "Cli" : "Command Line Interface",
-  "Cf"  : "CloudFront",
-  "Cm"  : "Cloud Map",
-  "Gl"  : "S3 Glacier",
-  "Sdk" : "Tools and SDKs",
-  "Lx"  : "Lex",
-  "M"   : "Macie",
-  "K"   : "Managed Streaming for Kafka",
-  "Emr" : "EMR",
-  "F"   : "Fargate"
-}
+# Bilder als gehashte Assets veröffentlichen (Standard) oder als Data-URIs einbetten
+INLINE_IMAGES = os.environ.get('PERIODIC_INLINE_IMAGES', '') == '1'
+
+# S3-Client, wird erst bei Bedarf erzeugt (lokale Läufe ohne bucket brauchen ihn nicht)
+s3 = None
+
+def get_s3():
+    global s3
+    if s3 is None:
+        import boto3
+        s3 = boto3.client('s3')
+    return s3
+
+# Persistent source cache: a prefix in a bucket the website doesn't serve (by
+# default the output bucket, whose CloudFront and website policies deny the
+# prefix), or a local directory
+CACHE_BUCKET = os.environ.get('PERIODIC_CACHE_BUCKET', '')
+CACHE_PREFIX = os.environ.get('PERIODIC_CACHE_PREFIX', '_cache/')
+CACHE_DIR = os.environ.get('PERIODIC_CACHE_DIR', '.periodic-cache')
+
+def open_cache_store():
+    if not bucket:
+        return LocalStore(CACHE_DIR)
+    return S3Store(get_s3(), CACHE_BUCKET or bucket, CACHE_PREFIX)
+
+# Keep symbols stable between runs via a persisted name -> symbol registry per source
+SYMBOL_REGISTRY = os.environ.get('PERIODIC_SYMBOL_REGISTRY', '1') == '1'
+
+# Grid layout of the tiles: classic, wide or blocks (see layout.py)
+LAYOUT = os.environ.get('PERIODIC_LAYOUT', 'classic')
 
-# For reverse lookup
-reserved_services = dict(map(reversed, reserved_symbols.items()))
+# Mark services added since the last snapshot before this month with a "new" badge
+NEW_BADGE = os.environ.get('PERIODIC_NEW_BADGE', '') == '1'
 
 # Some names are just to long to display, shorten them here
 preferred_names = {
@@ -92,276 +115,139 @@ colors = ["#834187", "#878541", "#458741", "#874145",
           "#7ab648", "#b6487a", "#b66548", "#48adb6",
           "#3aa6dd", "#dd703a", "#ddc23a", "#a73add"]
 
-# Parse prefix and name
-def parse_name(name):
-    search = re.search(r"(AWS|Amazon)*\s*(.*)", name)
-    prefix = search.group(1) or 'AWS'
-    name = search.group(2)
-    name = name.split("(",2)[0].strip()
-    return prefix, name
-
-# Create a symbol, roughly:
-# 1. Use a pre-defined symbol
-# 2. Create a 2 letter symbol using first letters of words in name
-# 3. Create a 2 letter symbol using fallback sequence if needed (handles 1-letter names)
-def create_symbol(symbols, name):
-
-    symbol = ""
-    if name in reserved_services:
-      # We have a specific symbol to use for this service
-      symbol = reserved_services[name]
-      symbols[symbol] = name
-    else:
-      cleaned = re.sub(r"[&,-/.]", '', name)
-      words = cleaned.split(' ')
-      words = [ elem for elem in words if not elem.islower() ]
-
-      # Build candidate character pool from words
-      initials = [ w[0:1] for w in words if w ]
-      tails = [ w[1:] for w in words if len(w) > 1 ]
-      chars = "".join(initials + tails)
-
-      # Primary strategy: combine first char with following chars from pool
-      for idx, first in enumerate(chars):
-        first_up = first.upper()
-        # prefer combining with subsequent chars
-        for char in chars[idx+1:]:
-          candidate = first_up + char.lower()
-          if candidate not in symbols:
-            symbols[candidate] = name
-            reserved_services[name] = candidate
-            symbol = candidate
-            break
-        if symbol:
-          break
-
-      # Fallback for very short names, e.g., "Q": allow single-letter or synthesize pairs
-      if not symbol and chars:
-        first_up = chars[0].upper()
-        # Try single-letter if free
-        if first_up not in symbols:
-          symbols[first_up] = name
-          reserved_services[name] = first_up
-          symbol = first_up
-        else:
-          # Try first letter + a fallback sequence
-          for suf in list('abcdefghijklmnopqrstuvwxyz') + list('ABCDEFGHIJKLMNOPQRSTUVWXYZ') + ['1','2','3']:
-            candidate = first_up + suf
-            if candidate not in symbols:
-              symbols[candidate] = name
-              reserved_services[name] = candidate
-              symbol = candidate
-              break
+# Fresh symbol allocator for one source, seeded with that source's symbols
+# from the previous run so they stay stable month to month
+def new_symbol_allocator(cache, source):
+    registry = cache.load_json(f"symbols/{source}.json") if SYMBOL_REGISTRY else None
+    return SymbolAllocator(registry=registry)
+
+# Record the symbols of this run as the next run's registry (persisted on commit)
+# and report how long the allocation took
+def save_symbol_registry(cache, source, allocator):
+    current_metrics().record(f"symbols_{source}", allocator.elapsed)
+    snapshot = allocator.registry_snapshot()
+    if SYMBOL_REGISTRY and snapshot:
+        cache.stage_json(f"symbols/{source}.json", snapshot)
+
+# Fetch a single page of the Directory API (conditional GET through the cache)
+def fetch_directory_page(cache, page, size=PERIODIC_PRODUCTS_SIZE):
+    resp = cache.get(f"{AWS_PRODUCTS_API}&size={size}&page={page}", get, headers=HEADERS)
+    return resp.json()
+
+# Yield the Directory API items page by page. The first page tells us the total
+# (metadata.totalHits); the remaining pages are then fetched concurrently with at
+# most PERIODIC_DIRECTORY_WORKERS requests in flight, and yielded in page order
+# as soon as each one has arrived. A page that still fails after the retries
+# fails the whole source, so it falls back to its last good dataset instead of
+# publishing (and snapshotting) a catalog with a hole in it.
+def fetch_directory_pages(cache, size=PERIODIC_PRODUCTS_SIZE, max_workers=PERIODIC_DIRECTORY_WORKERS):
+    try:
+        first = fetch_directory_page(cache, 0, size)
+    except Exception as e:
+        print("Failed to fetch directory API: %s" % e)
+        return
+    yield first.get('items', [])
 
-    if not symbol:
-      print("Couldn't generate symbol for %s: %s" % (name, chars if 'chars' in locals() else name))
+    total = first.get('metadata', {}).get('totalHits', 0)
+    pages = math.ceil(total / size) if size else 1
+    if pages <= 1:
+        return
 
-    return symbol
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(fetch_directory_page, cache, page, size) for page in range(1, pages)]
+        for page, future in enumerate(futures, start=1):
+            try:
+                items = future.result().get('items', [])
+            except Exception as e:
+                print("Failed to fetch directory API page %d: %s" % (page, e))
+                for pending in futures[page:]:
+                    pending.cancel()
+                raise RuntimeError(f"directory API page {page} of {pages - 1}: {e}") from e
+            yield items
 
 # Funktion zum Sammeln von Daten aus der Verzeichnis-API
-def get_data_from_directory():
+def get_data_from_directory(cache=None):
+    cache = cache or SourceCache()
     periodic = {'categories': [], 'title': "Periodic Table of Amazon Web Services",
               'description': "AWS Services from Directory API"}
     
     # Symbols already used
-    symbols = {}
+    symbols = new_symbol_allocator(cache, 'directory')
     
     # Services already processed
     names = {}
     
-    # Use AWS Products Directory endpoint to get services/features
-    try:
-        dj = get(AWS_PRODUCTS_API, headers=HEADERS, timeout=20)
-        dj.raise_for_status()
-        data = dj.json()
-    except Exception as e:
-        print("Failed to fetch directory API: %s" % e)
-        data = {"items": []}
-    items = data.get('items', [])
-
-    # Group items into categories using aws-technology-categories (preferred),
-    # falling back to aws-tech-category / badge, else 'Other'.
-    def friendly_from_slug(slug):
-        mapping = {
-            'analytics': 'Analytics', 'data-analytics': 'Analytics',
-            'compute': 'Compute',
-            'storage': 'Storage',
-            'networking-content-dev': 'Networking', 'networking': 'Networking',
-            'devtools': 'Developer Tools', 'developer-tools': 'Developer Tools',
-            'mgmt-govern': 'Management & Governance', 'management-governance': 'Management & Governance',
-            'ai-ml': 'Artificial Intelligence (AI)', 'machine-learning': 'Artificial Intelligence (AI)', 'ai': 'Artificial Intelligence (AI)',
-            'databases': 'Databases',
-            'app-integration': 'Application Integration', 'application-integration': 'Application Integration',
-            'media-services': 'Media Services',
-            'iot': 'Internet of Things',
-            'migration': 'Migration',
-            'euc': 'End-User Computing (EUC)', 'end-user-computing-euc': 'End-User Computing (EUC)',
-            'business-apps': 'Business Applications', 'business-applications': 'Business Applications',
-            'arch-strategy': 'Architecture Strategy', 'architecture-strategy': 'Architecture Strategy',
-            'satellite': 'Aerospace & Satellite', 'aerospace-satellite': 'Aerospace & Satellite',
-            'quantum': 'Quantum Technologies',
-            'blockchain': 'Blockchain',
-            'games': 'Game Tech', 'game-tech': 'Game Tech',
-            'cost-mgmt': 'Cloud Financial Management', 'cloud-financial-management': 'Cloud Financial Management',
-            'serverless': 'Serverless', 'mobile': 'Mobile'
-        }
-        return mapping.get(slug.strip().lower()) if isinstance(slug, str) else None
-
-    def derive_category_name(item_obj):
-        tags = item_obj.get('tags', [])
-        # Prefer aws-technology-categories (proper cased names)
-        for tg in tags:
-            if tg.get('tagNamespaceId') == 'GLOBAL#aws-technology-categories':
-                nm = tg.get('name') or ''
-                if nm:
-                    return nm
-        # Fallback: aws-tech-category slug → friendly
-        for tg in tags:
-            if tg.get('tagNamespaceId') == 'GLOBAL#aws-tech-category':
-                fr = friendly_from_slug(tg.get('name', ''))
-                if fr:
-                    return fr
-        # Secondary fallback: additionalFields.badge JSON containing category labels
-        af = item_obj.get('item', {}).get('additionalFields', {})
-        badge = af.get('badge')
-        if isinstance(badge, str):
-            try:
-                bj = json.loads(badge)
-                vals = bj.get('value') if isinstance(bj, dict) else None
-                if isinstance(vals, list) and vals:
-                    return vals[0]
-            except Exception:
-                pass
-        # Default
-        return 'Other'
+    # Use AWS Products Directory endpoint to get services/features; items are
+    # normalized and grouped page by page as the pages arrive
+    records = normalize_batches(fetch_directory_pages(cache))
 
     categories_by_name = {}
     color_index = 0
 
-    for it in items:
-        fields = it.get('item', {}).get('additionalFields', {})
-
-        # Prefer human-readable title from additionalFields
-        name = (
-            fields.get('title')
-            or fields.get('productTitle')
-            or fields.get('cardTitle')
-            or it.get('item', {}).get('title')
-        )
-        # Fallback: derive from the slug "item.name" if needed
-        if not name:
-            slug = it.get('item', {}).get('name')
-            if isinstance(slug, str) and slug:
-                name = slug.replace('-', ' ').replace('_', ' ').title()
-
-        if not name:
-            # Still no usable name, skip this entry
-            continue
-
-        if name in names:
-            continue
-        names[name] = 1
-
-        # Description: prefer rich body text, strip HTML tags if present
-        desc = fields.get('body') or fields.get('blurb') or fields.get('description') or ''
-        if isinstance(desc, str) and '<' in desc and '>' in desc:
-            try:
-                desc = BeautifulSoup(desc, 'html.parser').get_text(" ", strip=True)
-            except Exception:
-                pass
-
-        # Link: prefer CTA link, then other known link fields
-        link = (
-            fields.get('ctaLink')
-            or fields.get('primaryCTALink')
-            or fields.get('secondaryCTALink')
-            or fields.get('url')
-        )
-        if not link:
-            lnk = fields.get('link') or fields.get('learnMoreLink')
-            if isinstance(lnk, dict):
-                link = lnk.get('href')
-            elif isinstance(lnk, str):
-                link = lnk
-
-        # Determine category
-        cname = derive_category_name(it)
-        cclass = re.sub(r"[&, ]",'',cname)
-        if cname not in categories_by_name:
-            categories_by_name[cname] = {"name": cname, "services": [], "color": colors[color_index % len(colors)], "class": cclass}
-            color_index += 1
-
-        prefix, clean_name = parse_name(name)
-        symbol = create_symbol(symbols, clean_name)
-        if clean_name in preferred_names:
-            clean_name = preferred_names[clean_name]
-
-        categories_by_name[cname]['services'].append({
-            'name': clean_name,
-            'desc': desc,
-            'link': link or '',
-            'prefix': prefix,
-            'symbol': symbol,
-            'category': cclass,
-            'long': len(clean_name) > 11,
-            'reallong': len(clean_name) > 20
-        })
+    for batch in records:
+        for record in batch:
+            if record.title in names:
+                continue
+            names[record.title] = 1
+
+            # Determine category
+            cname = record.category
+            if cname not in categories_by_name:
+                categories_by_name[cname] = {"name": cname, "services": [], "color": colors[color_index % len(colors)], "class": record.category_class}
+                color_index += 1
+
+            clean_name = record.name
+            symbol = symbols.allocate(clean_name)
+            if clean_name in preferred_names:
+                clean_name = preferred_names[clean_name]
+
+            # desc may contain HTML; tags are only stripped (in one batch) if an
+            # output uses it, see materialize_descriptions
+            categories_by_name[cname]['services'].append({
+                'name': clean_name,
+                'desc': record.desc,
+                'link': record.link,
+                'prefix': record.prefix,
+                'symbol': symbol,
+                'category': record.category_class,
+                'long': len(clean_name) > 11,
+                'reallong': len(clean_name) > 20
+            })
 
     # Append categories in insertion order
     for cat in categories_by_name.values():
         if cat['services']:
             periodic['categories'].append(cat)
-            
+    
+    save_symbol_registry(cache, 'directory', symbols)
     return periodic
 
-# Funktion zum Sammeln von Daten durch Scraping
-def get_data_from_scrape():
+# Funktion zum Sammeln von Daten durch Scraping. Returns None without parsing
+# when the products page is unchanged since the last run (HTTP 304).
+def get_data_from_scrape(cache=None):
+    cache = cache or SourceCache()
     periodic = {'categories': [], 'title': "Periodic Table of Amazon Web Services",
               'description': "AWS Services from Web Scraping"}
     
     # Symbols already used
-    symbols = {}
+    symbols = new_symbol_allocator(cache, 'scrape')
     
     # Services already processed
     names = {}
     
     try:
-        raw = get('https://aws.amazon.com/products/', headers=HEADERS, timeout=20)
-        soup = BeautifulSoup(raw.content, 'html.parser')
-        
-        # Extract JSON data from the page
-        scripts = soup.find_all('script')
-        nav_data = None
-        for script in scripts:
-            if script.string and 'globalNav' in script.string and len(script.string) > 10000:
-                text = script.string
-                start_idx = text.find('{"data":{"items"')
-                if start_idx != -1:
-                    brace_count = 0
-                    for i in range(start_idx, len(text)):
-                        if text[i] == '{':
-                            brace_count += 1
-                        elif text[i] == '}':
-                            brace_count -= 1
-                            if brace_count == 0:
-                                json_text = text[start_idx:i+1]
-                                data = json.loads(json_text)
-                                nav_json_str = data['data']['items'][0]['fields']['globalNav']
-                                nav_data = json.loads(nav_json_str)
-                                break
-                break
-        
+        raw = cache.get('https://aws.amazon.com/products/', get, headers=HEADERS)
+        if raw.not_modified:
+            return None
+        # Extract JSON navigation data from the page
+        nav_data = extract_nav_data(raw.content)
         if not nav_data:
             print("Could not find product data in page")
             return periodic
         
         # Parse the navigation data
         ccount = 0
-        products_menu = None
-        for item in nav_data['items']:
-            if item['name'] == 'Products':
-                products_menu = item
-                break
+        products_menu = find_products_menu(nav_data)
         
         if not products_menu or 'subNav' not in products_menu:
             print("Could not find Products menu")
@@ -373,7 +259,7 @@ def get_data_from_scrape():
                 continue
             
             cname = cat_item['name']
-            cclass = re.sub(r"[&, ]",'',cname)
+            cclass = category_class(cname)
             category = {"name": cname, "services":[], "color": colors[ccount % len(colors)], "class":cclass}
             ccount += 1
             
@@ -399,7 +285,7 @@ def get_data_from_scrape():
                     link = item.get('hyperLink', '')
                     
                     prefix, clean_name = parse_name(name)
-                    symbol = create_symbol(symbols, clean_name)
+                    symbol = symbols.allocate(clean_name)
                     
                     if clean_name in preferred_names:
                         clean_name = preferred_names[clean_name]
@@ -420,87 +306,327 @@ def get_data_from_scrape():
     
     except Exception as e:
         print(f"Error during scraping: {e}")
-        
+    
+    save_symbol_registry(cache, 'scrape', symbols)
     return periodic
 
-# Funktion zum Berechnen der Elementpositionen in der Tabelle
-def compute_positions(periodic):
-    # Vertical order for topmost rows
-    vlayout = [
-        [1,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,1,1],
-        [1,1,0,0,0,0,0,0,0,0,0,0,1,1,1,1,1,1,1],
-        [1,1,0,0,0,0,0,0,0,0,0,0,1,1,1,1,1,1,1],
-        [1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1],
-        [1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1],
-        [1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1],
-        [1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1],
-        [1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1],
-        [1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1],
-    ]
-    vlayout = list(zip(*vlayout)) # transpose for easier handling
-    
-    # Horizontal layout for bottom 3+ rows
-    hlayout = [
-        [0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0],
-        [0,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1],
-        [0,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1]
-    ]
-    
-    indices = []
-    hrow = 0
-    for row in range(0,len(vlayout)):
-        for col in range(0, len(vlayout[row])):
-            if vlayout[row][col]:
-                indices.append([hrow+col+1, row+1])
-                
-    hrow = col + 2
-    for row in range(0,len(hlayout)):
-        for col in range(0, len(hlayout[row])):
-            if hlayout[row][col]:
-                indices.append([hrow+row+1, col+1])
-    
-    # Ensure we have enough indices for all services
-    total_services = sum(len(cat.get("services", [])) for cat in periodic['categories'])
-    if total_services > len(indices):
-        extra = total_services - len(indices)
-        # Determine starting row after the predefined layout
-        start_row = (indices[-1][0] + 1) if indices else 1
-        # Fill extra indices row-wise across 19 columns per row
-        COLS = 19
-        for i in range(extra):
-            row = start_row + (i // COLS)
-            col = (i % COLS) + 1
-            indices.append([row, col])
-    
-    # Assign computed positions
-    count = 0
+# Price List offers as a catalog with a single 'Other' category. Returns
+# (catalog, not_modified).
+def get_price_list_catalog(cache):
+    raw = cache.get(PRICE_LIST_URL, get, headers=HEADERS, timeout=30)
+    services = []
+    for code, offer in sorted(raw.json().get('offers', {}).items()):
+        prefix, clean_name = parse_name(offer.get('offerName') or code)
+        services.append({'name': clean_name, 'desc': '', 'link': '', 'prefix': prefix,
+                         'long': len(clean_name) > 11, 'reallong': len(clean_name) > 20})
+    catalog = {'categories': [{'name': 'Other', 'class': 'Other', 'color': colors[0], 'services': services}]}
+    return catalog, raw.not_modified
+
+# Matching aliases for the merged source: reserved symbols ("S3" -> "Simple
+# Storage Service") and the shortened display names
+MERGE_ALIASES = build_aliases(reserved_symbols, dict(map(reversed, preferred_names.items())))
+
+# Funktion zum Zusammenführen der Quellen: Directory API zuerst (vollständigste
+# Kategorien), dann fehlende Services aus dem Scraping, optional die Price List.
+# Returns None when none of the inputs changed.
+def get_data_merged(cache, data_by_source, changed):
+    price_list, price_list_unchanged = None, True
+    if MERGE_PRICE_LIST:
+        try:
+            price_list, price_list_unchanged = get_price_list_catalog(cache)
+        except Exception as e:
+            print(f"Failed to fetch the Price List: {e}")
+    if not changed and price_list_unchanged:
+        return None
+
+    # An unchanged products page (304) wasn't parsed: its data is the snapshot of
+    # the last run that changed it (no second request, the scrape symbols stay untouched)
+    scrape = data_by_source.get('scrape')
+    if scrape is None:
+        scrape = load_snapshot(cache, 'scrape')
+        if scrape is None:
+            print("Kein Snapshot der Quelle scrape, merged ohne Scraping-Daten")
+    periodic = {'title': "Periodic Table of Amazon Web Services",
+                'description': "AWS Services from all sources",
+                'categories': merge_catalogs([data_by_source.get('directory'), scrape, price_list],
+                                             MERGE_ALIASES, colors)}
+
+    # Reserved symbols are keyed by the full name, not the shortened display name
+    full_names = dict(map(reversed, preferred_names.items()))
+    symbols = new_symbol_allocator(cache, 'merged')
     for category in periodic['categories']:
-        for service in category["services"]:
-            service['row'] = indices[count][0]
-            service['column'] = indices[count][1]
-            count = count + 1
-    
-    # Compute required grid rows for template based on actual content
-    periodic['grid_rows'] = max((pos[0] for pos in indices[:total_services]), default=10)
-    
+        for service in category['services']:
+            service['symbol'] = symbols.allocate(full_names.get(service['name'], service['name']))
+    save_symbol_registry(cache, 'merged', symbols)
     return periodic
 
-# Lambda-Handler-Funktion für multi_source_periodic.py
-def lambda_handler(event, context):
-    # Generiere die HTML für jede unterstützte Datenquelle
-    html_files = {}
-    
-    # Generiere die Daten für alle Datenquellen
+# Data sources fetched by the handler; each entry fetches and parses one source
+# (merged is built from their results afterwards)
+SOURCE_FETCHERS = {
+  'directory': get_data_from_directory,
+  'scrape': get_data_from_scrape,
+}
+
+# Fetch and parse all sources concurrently, so wall time is set by the slowest
+# source instead of the sum of all of them. Each source fetches through its own
+# cache view; one that raises or takes longer than FETCH_TIMEOUT seconds fails
+# without affecting the others and falls back to its last good dataset (see
+# accept_dataset). Sources that are unchanged since the last run (HTTP 304 or
+# same dataset hash) are left out of the returned `changed` set.
+def fetch_all_sources(fetchers=None, cache=None, timeout=FETCH_TIMEOUT):
+    fetchers = fetchers or SOURCE_FETCHERS
+    cache = cache or SourceCache()
+
+    def timed(fetch, view):
+        started = time.perf_counter()
+        return fetch(view), time.perf_counter() - started
+
+    metrics = current_metrics()
+    failures = failed_sources(cache, fetchers)
+    views = {source: cache.for_source(revalidate=source not in failures) for source in fetchers}
+    results = {}
+    timings = {}
+    # No `with`: a source that overruns the timeout must not hold up the others
+    pool = ThreadPoolExecutor(max_workers=len(fetchers))
+    futures = {pool.submit(timed, fetch, views[source]): source for source, fetch in fetchers.items()}
+    try:
+        for future in as_completed(futures, timeout=timeout):
+            source = futures[future]
+            try:
+                data, elapsed = future.result()
+                results[source] = data, None
+            except Exception as e:
+                print(f"Fehler beim Abrufen der Quelle {source}: {e}")
+                data, elapsed = None, None
+                results[source] = None, f"error: {e}"
+            timings[source] = elapsed
+            metrics.record(f"fetch_{source}", elapsed)
+    except FuturesTimeout:
+        for source in fetchers:
+            if source not in results:
+                print(f"Quelle {source}: keine Antwort nach {timeout:g}s")
+                results[source] = None, f"timed out after {timeout:g}s"
+                timings[source] = None
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
     data_by_source = {}
-    
-    # Daten aus Directory API (und Merged) holen
-    dir_data = get_data_from_directory()
-    data_by_source['directory'] = dir_data
-    data_by_source['merged'] = dir_data  # Merged verwendet aktuell die Directory-Daten
-    
-    # Daten aus Web Scraping holen
-    scrape_data = get_data_from_scrape()
-    data_by_source['scrape'] = scrape_data
+    changed = set()
+    fallback = set()
+    for source in fetchers:
+        data, error = results[source]
+        data, status = accept_dataset(cache, views[source], source, data, error, failures)
+        data_by_source[source] = data
+        if status in ('changed', 'fallback'):
+            changed.add(source)
+        if status == 'fallback':
+            fallback.add(source)
+
+        elapsed = timings[source]
+        took = f"{elapsed:.2f}s" if elapsed is not None else "fehlgeschlagen"
+        if status == 'changed':
+            print(f"Quelle {source}: {service_count(data)} Services ({took})")
+        elif status == 'fallback':
+            print(f"Quelle {source}: letzter guter Stand mit {service_count(data)} Services ({took})")
+        elif status == 'unchanged':
+            print(f"Quelle {source}: unverändert ({took})")
+
+    return data_by_source, changed, fallback
+
+# Prüft einen abgerufenen Datensatz gegen den letzten guten Stand (Snapshot).
+# Ist er unbrauchbar (Fehler, Zeitüberschreitung, zu wenige Services), wird alles
+# verworfen, was die Quelle im Cache vorgemerkt hat, der Fehler für den nächsten
+# Lauf vermerkt und der Snapshot veröffentlicht. Returns (data, status) with
+# status 'changed', 'unchanged', 'fallback' or 'failed' (no snapshot to fall back to)
+def accept_dataset(cache, view, source, data, error, failures):
+    if error is None and data is None:
+        return None, 'unchanged'
+    last_good = load_snapshot(cache, source)
+    reason = error or check_dataset(data, last_good)
+    if reason is None:
+        if source in failures:
+            clear_failure(cache, source)
+        return data, ('changed' if cache.dataset_changed(source, data) else 'unchanged')
+
+    view.discard()
+    record_failure(cache, source, reason, data, last_good)
+    current_metrics().add('source_failures', 1)
+    print(f"Quelle {source} unbrauchbar: {reason}")
+    if last_good is None:
+        print(f"Quelle {source}: kein Snapshot vorhanden, wird nicht veröffentlicht")
+        return {'categories': [], 'title': "Periodic Table of Amazon Web Services",
+                'description': f"AWS Services ({source} unavailable)"}, 'failed'
+    return last_good, 'fallback'
+
+# Funktion zum Berechnen der Elementpositionen in der Tabelle
+def compute_positions(periodic):
+    # Position table of the layout is built once per container and shared by all sources
+    return get_layout(LAYOUT).place(periodic)
+
+# Lambda-Handler-Funktion für multi_source_periodic.py. Pro Aufruf wird ein
+# Metrik-Datensatz (CloudWatch EMF) mit Zeiten und Speicher je Phase ausgegeben;
+# die Restlaufzeit aus dem Kontext begrenzt die einzelnen Phasen (deadline.py)
+def lambda_handler(event, context):
+    with Metrics(function=getattr(context, 'function_name', 'periodic-table-local')) as metrics:
+        return generate(event, metrics, Deadline.from_context(context))
+
+# Die ausgewählten Quellen abrufen (parallel) und die kombinierte Quelle bilden;
+# geänderte Quellen werden zusätzlich als Snapshot für Render-only-Läufe
+# gespeichert. Für merged kommen nicht ausgewählte Eingaben aus ihren Snapshots;
+# rebuild_merged bildet merged auch ohne geänderte Eingaben neu
+def refresh_sources(cache, metrics, timeout=FETCH_TIMEOUT, sources=SUPPORTED_SOURCES, rebuild_merged=False):
+    fetchers = {source: fetch for source, fetch in SOURCE_FETCHERS.items() if source in sources}
+    with metrics.stage('fetch'):
+        if fetchers:
+            data_by_source, changed, fallback = fetch_all_sources(fetchers, cache, timeout)
+        else:
+            data_by_source, changed, fallback = {}, set(), set()
+    if 'merged' in sources:
+        with metrics.stage('merge'):
+            for source in SOURCE_FETCHERS:
+                if source not in fetchers:
+                    data_by_source[source] = load_snapshot(cache, source)
+            failures = failed_sources(cache, ['merged'])
+            view = cache.for_source(revalidate='merged' not in failures)
+            inputs_changed = changed | {'merged'} if rebuild_merged else changed
+            try:
+                merged, error = get_data_merged(view, data_by_source, inputs_changed), None
+            except Exception as e:
+                print(f"Fehler beim Zusammenführen der Quellen: {e}")
+                merged, error = None, f"error: {e}"
+            merged, status = accept_dataset(cache, view, 'merged', merged, error, failures)
+        if merged is not None:
+            data_by_source['merged'] = merged
+        if status in ('changed', 'fallback'):
+            changed.add('merged')
+            print(f"Quelle merged: {service_count(merged)} Services"
+                  + (" (letzter guter Stand)" if status == 'fallback' else ""))
+        if status == 'fallback':
+            fallback.add('merged')
+    metrics.add('bytes_downloaded', cache.bytes_downloaded, 'Bytes')
+    metrics.add('not_modified_responses', cache.not_modified)
+    # Nur geprüfte, neue Daten werden zum letzten guten Stand
+    for source in changed - fallback:
+        save_snapshot(cache, source, data_by_source[source])
+    return data_by_source, changed, fallback
+
+# Verlauf: geänderte Quellen mit Datum ablegen und mit dem vorherigen Stand
+# vergleichen; für die übrigen gilt die Änderungsliste ihres letzten Laufs
+def build_changelog(history, data_by_source, recorded):
+    changelog = {'generated': history.today, 'sources': {}}
+    for source in SUPPORTED_SOURCES:
+        periodic = data_by_source.get(source)
+        if source in recorded and periodic and periodic['categories']:
+            changes = history.record(source, periodic)
+        else:
+            changes = history.latest_changes(source)
+        if changes:
+            changelog['sources'][source] = changes
+            print(f"Änderungen {source} seit {changes['previous']}: "
+                  + ", ".join(f"{count} {kind}" for kind, count in summary(changes).items()))
+    return changelog
+
+# Betriebsarten eines Aufrufs:
+#   refresh: Quellen abrufen, geänderte rendern und veröffentlichen (Standard)
+#   render:  ohne Netzwerkzugriff aus den Snapshots rendern und veröffentlichen
+#   publish: weder abrufen noch rendern; Assets hochladen und index.html erneut
+#            aus der veröffentlichten Seite der Standardquelle kopieren
+MODES = ('refresh', 'render', 'publish')
+
+# Ereignis auswerten: {"mode": ..., "sources": [...], "force": true}. Ohne
+# "sources" werden alle Quellen bearbeitet; {"render_only": true} entspricht
+# {"mode": "render"}. Returns (mode, sources in SUPPORTED_SOURCES order, force)
+def parse_event(event):
+    mode = event.get('mode') or ('render' if event.get('render_only') else 'refresh')
+    if mode not in MODES:
+        raise ValueError(f"Unbekannter Modus {mode!r}, erlaubt: {', '.join(MODES)}")
+    selected = event.get('sources') or SUPPORTED_SOURCES
+    if isinstance(selected, str):
+        selected = [selected]
+    unknown = [source for source in selected if source not in SUPPORTED_SOURCES]
+    if unknown:
+        raise ValueError(f"Unbekannte Quellen {unknown}, erlaubt: {', '.join(SUPPORTED_SOURCES)}")
+    return mode, [source for source in SUPPORTED_SOURCES if source in selected], bool(event.get('force'))
+
+# volatile: Texte, die nicht in den Hash der Seiten eingehen (das Tagesdatum)
+def new_publisher(volatile=()):
+    return S3Publisher(get_s3(), bucket, volatile=volatile) if bucket else LocalPublisher(volatile=volatile)
+
+# Bilder und Stylesheet hochladen (nur fehlende, sie sind inhaltsadressiert).
+# Returns False if an asset failed
+def publish_static_assets(publisher, metrics):
+    if INLINE_IMAGES:
+        return True
+    ok = True
+    output_dir = os.path.dirname(key)
+    assets = {os.path.join(output_dir, asset.path): asset for asset in static_assets().values()}
+    with metrics.stage('publish_assets'):
+        asset_results = publisher.publish_assets(assets)
+    for result in asset_results:
+        if result.status == 'failed':
+            print(f"Fehler beim Speichern des Assets {result.key}: {result.error}")
+            ok = False
+        elif result.status == 'uploaded':
+            print(f"Asset {result.key} wurde gespeichert")
+            metrics.add('bytes_uploaded', result.size, 'Bytes')
+    return ok
+
+# Nur veröffentlichen: Assets und index.html als Kopie der bereits
+# veröffentlichten Seite der Standardquelle, falls diese ausgewählt ist
+def republish(metrics, sources):
+    publisher = new_publisher()
+    publish_static_assets(publisher, metrics)
+    results = []
+    if DEFAULT_SOURCE in sources:
+        with metrics.stage('output'):
+            results = publisher.publish_aliases({key: f"{key_prefix}_{DEFAULT_SOURCE}.html"})
+    for result in results:
+        if result.status == 'failed':
+            print(f"Fehler beim Kopieren nach {result.key}: {result.error}")
+        else:
+            print(f"Datei {result.key}: {result.status}")
+    metrics.prop('publish', {result.key: result.status for result in results})
+
+# Tabellen erzeugen und veröffentlichen
+def generate(event, metrics, deadline=None):
+    # Generiere die Daten für die ausgewählten Datenquellen (parallel). Mit
+    # {"force": true} wird der Cache ignoriert und alles neu erzeugt (z.B. nach
+    # Template-Änderungen); nicht ausgewählte Quellen bleiben unberührt
+    event = event or {}
+    deadline = deadline or Deadline()
+    mode, sources, force = parse_event(event)
+    metrics.prop('mode', mode)
+    metrics.prop('sources', sources)
+    metrics.prop('force', force)
+    if mode == 'publish':
+        return republish(metrics, sources)
+    cache = SourceCache(open_cache_store(), revalidate=not force)
+    render_only = mode == 'render'
+    if render_only:
+        with metrics.stage('snapshots'):
+            data_by_source = load_snapshots(cache, sources)
+        changed, fallback = set(data_by_source), set()
+        for source in sources:
+            if source not in changed:
+                print(f"Quelle {source}: kein Snapshot vorhanden, übersprungen")
+    else:
+        # Abrufen darf höchstens bis OUTPUT_RESERVE Sekunden vor Schluss dauern;
+        # langsamere Quellen fallen auf ihren letzten guten Stand zurück
+        fetch_budget = deadline.budget(FETCH_TIMEOUT, keep=OUTPUT_RESERVE)
+        http_client.deadline = deadline.at(fetch_budget)
+        metrics.prop('fetch_budget', round(fetch_budget, 1))
+        data_by_source, changed, fallback = refresh_sources(cache, metrics, fetch_budget, sources,
+                                                            rebuild_merged=bool(event.get('sources')))
+    metrics.prop('changed_sources', sorted(changed))
+    metrics.prop('fallback_sources', sorted(fallback))
+    if not changed:
+        print("Keine Änderungen an den Datenquellen, nichts zu tun")
+        cache.commit()
+        return
+
+    history = History(cache)
+    changelog = build_changelog(history, data_by_source, set() if render_only else changed - fallback)
+    metrics.prop('changelog', {source: summary(changes) for source, changes in changelog['sources'].items()})
     
     # Erstelle die Tab-Navigation für ALLE Quellen VOR der Schleife
     all_sources_meta = []
@@ -520,104 +646,166 @@ def lambda_handler(event, context):
             'source': source  # Merke die Quelle für die active-Prüfung
         })
     
-    # Für jede Datenquelle eine HTML-Datei generieren
-    for source in SUPPORTED_SOURCES:
-        if source in data_by_source:
-            # Berechne Positionen für die Elemente
-            periodic_data = compute_positions(data_by_source[source])
-            
-            # Dateinamen für diese Quelle festlegen
-            filename = f"{key_prefix}_{source}.html"
-            
-            # Erstelle eine Kopie der sources_meta mit korrektem active-Flag
-            sources_meta = []
-            for src_meta in all_sources_meta:
-                sources_meta.append({
-                    'filename': src_meta['filename'],
-                    'label': src_meta['label'],
-                    'active': src_meta['source'] == source  # Aktiv wenn es die aktuelle Quelle ist
-                })
-            
-            # Erweiterung des Datenkontextes für Templating
-            periodic_data['data_sources'] = sources_meta  # Tab-Informationen
-            periodic_data['logo_data_uri'] = LOGO_DATA_URI  # Eingebettetes Logo
-            periodic_data['favicon_data_uri'] = FAVICON_DATA_URI  # Eingebettetes Favicon
-            periodic_data['last_update'] = datetime.now().strftime('%B %d, %Y')  # Aktuelles Datum
-            
-            # Debug: Print sources_meta für diese Datei
-            print(f"Generiere {filename} mit {len(sources_meta)} Tabs:")
-            for sm in sources_meta:
-                print(f"  - {sm['label']} ({'aktiv' if sm.get('active') else 'inaktiv'})")
-            
-            # Template laden und HTML rendern
-            template_path = os.path.join(os.path.dirname(__file__), 'base_template.mustache')
-            with open(template_path, 'r') as f:  
-                template = f.read()
-                html = pystache.render(template, periodic_data)
-                html_files[filename] = html
-    
-    # Speichern der generierten HTML-Dateien
-    for filename, html_content in html_files.items():
-        if bucket:  # Wenn S3-Bucket konfiguriert ist
-            try:
-                # Komprimiere HTML mit Gzip für schnellere Übertragung
-                html_bytes = html_content.encode('utf-8')
-                compressed_html = gzip.compress(html_bytes, compresslevel=9)
-                
-                s3.put_object(
-                    ContentType='text/html',
-                    ContentEncoding='gzip',
-                    CacheControl='public, max-age=2592000',
-                    Body=compressed_html,
-                    Bucket=bucket,
-                    Key=filename)
-                
-                # Berechne Komprimierungsrate
-                compression_ratio = (1 - len(compressed_html) / len(html_bytes)) * 100
-                print(f"Datei {filename} wurde in S3-Bucket {bucket} hochgeladen (komprimiert: {compression_ratio:.1f}% kleiner)")
-            except Exception as e:
-                print(f"Fehler beim Hochladen der Datei {filename} in S3: {e}")
-        else:  # Lokale Speicherung, wenn kein Bucket konfiguriert ist
-            try:
-                # Stellen Sie sicher, dass das Zielverzeichnis existiert
-                output_dir = os.path.dirname(filename)
-                if output_dir and not os.path.exists(output_dir):
-                    os.makedirs(output_dir)
-                
-                with open(filename, 'w', encoding='utf-8') as f:
-                    f.write(html_content)
-                print(f"Datei {filename} wurde lokal gespeichert")
-            except Exception as e:
-                print(f"Fehler beim lokalen Speichern der Datei {filename}: {e}")
+    # Das Datum steht in jeder Seite, zählt aber nicht als Änderung: eine Seite
+    # mit unveränderten Daten wird auch am nächsten Tag nicht neu hochgeladen
+    last_update = datetime.now().strftime('%B %d, %Y')
+    publisher = new_publisher(volatile=[last_update])
+
+    # Bilder und Stylesheet vor den Seiten veröffentlichen, damit keine Seite auf ein fehlendes Asset zeigt
+    publish_ok = publish_static_assets(publisher, metrics)
+
+    # Eine HTML-Datei für eine Datenquelle erzeugen
+    def render_page(source):
+        # Berechne Positionen für die Elemente
+        started = time.perf_counter()
+        periodic_data = compute_positions(data_by_source.pop(source))
+        metrics.record('layout', time.perf_counter() - started)
+        if NEW_BADGE:
+            mark_new(periodic_data, history.new_this_month(source, periodic_data))
+        
+        # Dateinamen für diese Quelle festlegen
+        filename = f"{key_prefix}_{source}.html"
+        
+        # Erstelle eine Kopie der sources_meta mit korrektem active-Flag
+        sources_meta = []
+        for src_meta in all_sources_meta:
+            sources_meta.append({
+                'filename': src_meta['filename'],
+                'label': src_meta['label'],
+                'active': src_meta['source'] == source  # Aktiv wenn es die aktuelle Quelle ist
+            })
+        
+        # Erweiterung des Datenkontextes für Templating
+        periodic_data['data_sources'] = sources_meta  # Tab-Informationen
+        periodic_data.update(image_context(INLINE_IMAGES))  # Logo und Favicon (URL oder Data-URI)
+        periodic_data.update(style_context(periodic_data, INLINE_IMAGES))  # Stylesheet-URL und Inline-CSS mit CSP-Hash
+        periodic_data['last_update'] = last_update  # Aktuelles Datum
+        
+        # Debug: Print sources_meta für diese Datei
+        print(f"Generiere {filename} mit {len(sources_meta)} Tabs:")
+        for sm in sources_meta:
+            print(f"  - {sm['label']} ({'aktiv' if sm.get('active') else 'inaktiv'})")
+        
+        # HTML mit dem einmal geladenen und geparsten Template rendern
+        started = time.perf_counter()
+        engine = get_engine('base_template')
+        # Beschreibungen nur aufbereiten, wenn das Template sie auch ausgibt
+        if engine.uses('desc'):
+            materialize_descriptions(periodic_data)
+        # Kacheln und Legendeneinträge, die sich seit dem letzten Rendern
+        # (auch in früheren warmen Aufrufen) nicht geändert haben, kommen aus dem Memo
+        rendered, reused = engine.stats()
+        html = engine.render(periodic_data)
+        metrics.record('render', time.perf_counter() - started)
+        metrics.add('html_bytes', len(html), 'Bytes')
+        now_rendered, now_reused = engine.stats()
+        metrics.add('fragments_rendered', now_rendered - rendered)
+        metrics.add('fragments_reused', now_reused - reused)
+        return filename, html
+
+    # Die übrigen Seiten werden einzeln gerendert und direkt komprimiert und
+    # hochgeladen, statt alle im Speicher zu halten. Vor jeder Seite wird geprüft,
+    # ob die Restlaufzeit reicht: wird sie knapp, geht es mit den schnellsten
+    # Kompressionsstufen weiter, reicht sie nicht mehr, wird die Quelle
+    # übersprungen und im nächsten Lauf veröffentlicht
+    skipped = []
+    fast_compression = False
+    def render_pages(sources, page_time):
+        nonlocal fast_compression
+        last = time.perf_counter()
+        for source in sources:
+            now = time.perf_counter()
+            page_time, last = max(page_time, now - last), now
+            left = deadline.remaining()
+            if left < page_time * 2:
+                skipped.append(source)
+                continue
+            if left < page_time * 4 and not fast_compression:
+                print(f"Noch {left:.1f}s Zeit, schnellere Kompression für die übrigen Seiten")
+                publisher.levels = {**getattr(publisher, 'levels', {}), **FAST_LEVELS}
+                fast_compression = True
+            yield render_page(source)
+
+        # Änderungsliste aller Quellen als JSON neben den Seiten
+        yield f"{key_prefix}_changelog.json", json.dumps(changelog, indent=1, ensure_ascii=False)
     
-    # Zusätzlich eine index.html-Datei erstellen, die auf die Standardquelle verweist
-    if DEFAULT_SOURCE in data_by_source:
-        # Index ist identisch mit der HTML-Datei der Standardquelle, aber mit angepasstem Titel
-        default_file = f"{key_prefix}_{DEFAULT_SOURCE}.html"
-        if default_file in html_files:
-            if bucket:
-                # Komprimiere auch index.html mit Gzip
-                html_bytes = html_files[default_file].encode('utf-8')
-                compressed_html = gzip.compress(html_bytes, compresslevel=9)
-                
-                s3.put_object(
-                    ContentType='text/html',
-                    ContentEncoding='gzip',
-                    CacheControl='public, max-age=2592000',
-                    Body=compressed_html,
-                    Bucket=bucket,
-                    Key=key)  # Standarddateiname (meistens index.html)
-                
-                compression_ratio = (1 - len(compressed_html) / len(html_bytes)) * 100
-                print(f"Standarddatei {key} wurde in S3-Bucket {bucket} hochgeladen (komprimiert: {compression_ratio:.1f}% kleiner)")
-            else:
-                try:
-                    with open(key, 'w', encoding='utf-8') as f:
-                        f.write(html_files[default_file])
-                    print(f"Standarddatei {key} wurde lokal gespeichert")
-                except Exception as e:
-                    print(f"Fehler beim lokalen Speichern der Standarddatei {key}: {e}")
+    # Unveränderte Dateien werden übersprungen, index.html ist eine Kopie der
+    # Datei der Standardquelle. Standardseite und index.html kommen zuerst, damit
+    # sie auch bei knapper Zeit sicher veröffentlicht werden
+    default_file = f"{key_prefix}_{DEFAULT_SOURCE}.html"
+    others = [source for source in SUPPORTED_SOURCES if source in changed and source != DEFAULT_SOURCE]
+
+    # Rendern, Komprimieren und Hochladen laufen verschränkt ab
+    with metrics.stage('output'):
+        started = time.perf_counter()
+        page_results = []
+        if DEFAULT_SOURCE in changed:
+            page_results += publisher.publish([render_page(DEFAULT_SOURCE)], {key: default_file})
+        page_results += publisher.publish(render_pages(others, time.perf_counter() - started))
+    # Unkomprimierte und komprimierte Bytes je Encoding (gzip, br); ein br, das
+    # mangels brotli eine gzip-Kopie ist, zählt nicht
+    uncompressed = 0
+    compressed = {}
+    for result in page_results:
+        metrics.add(f"pages_{result.status}", 1)
+        if result.status == 'uploaded':
+            metrics.add('bytes_uploaded', sum((result.variants or {}).values()) or result.size, 'Bytes')
+            metrics.record('compress', result.compress_time)
+            if result.variants:
+                uncompressed += result.size
+                for encoding, size in result.variants.items():
+                    if available(encoding):
+                        compressed[encoding] = compressed.get(encoding, 0) + size
+        if result.status == 'uploaded' and bucket and not result.variants:
+            print(f"Datei {result.key} wurde in S3-Bucket {bucket} hochgeladen "
+                  f"(unkomprimiert, kleiner als {MIN_COMPRESS_SIZE} Bytes)")
+        elif result.status == 'uploaded' and bucket:
+            savings = ', '.join(f"{encoding}: {(1 - size / result.size) * 100:.1f}% kleiner"
+                                for encoding, size in result.variants.items() if available(encoding))
+            missing = [encoding for encoding in result.variants if not available(encoding)]
+            if missing:
+                savings += f"; {', '.join(missing)} nicht verfügbar, als Kopie von gzip gespeichert"
+            print(f"Datei {result.key} wurde in S3-Bucket {bucket} hochgeladen (komprimiert {savings})")
+        elif result.status == 'uploaded':
+            print(f"Datei {result.key} wurde lokal gespeichert")
+        elif result.status == 'copied':
+            print(f"Standarddatei {result.key} wurde als Kopie von {default_file} erstellt")
+        elif result.status == 'unchanged':
+            print(f"Datei {result.key} ist unverändert, übersprungen")
+        else:
+            print(f"Fehler beim Speichern der Datei {result.key}: {result.error}")
+            publish_ok = False
+
+    for encoding, size in compressed.items():
+        metrics.put('compression_ratio' if encoding == 'gzip' else f"compression_ratio_{encoding}", uncompressed / size)
+    metrics.prop('publish', {result.key: result.status for result in page_results})
+
+    # Aus Zeitmangel übersprungene Quellen: Datensatz-Hash ungültig machen und wie einen
+    # Fehler vermerken, damit der nächste Lauf sie vollständig abruft und veröffentlicht
+    for source in skipped:
+        print(f"Quelle {source}: keine Zeit mehr, wird im nächsten Lauf veröffentlicht")
+        cache.invalidate_dataset(source)
+        record_failure(cache, source, "not published: out of time", data_by_source.get(source))
+    metrics.prop('skipped_sources', skipped)
+    metrics.prop('fast_compression', fast_compression)
+    if deadline.limited:
+        metrics.put('remaining_time', deadline.remaining(), 'Seconds')
+
+    # Cache erst nach erfolgreicher Veröffentlichung fortschreiben, damit ein
+    # fehlgeschlagener Lauf beim nächsten Mal wiederholt wird
+    if publish_ok:
+        cache.commit()
 
 # Wenn das Skript direkt ausgeführt wird (nicht als Lambda)
 if __name__ == "__main__":
-    lambda_handler(None, None)
+    import argparse
+    parser = argparse.ArgumentParser(description="Periodic Table of AWS Services erzeugen")
+    parser.add_argument('--force', action='store_true', help="Cache ignorieren und alle Seiten neu erzeugen")
+    parser.add_argument('--render-only', action='store_true',
+                        help="Seiten ohne Netzwerkzugriff aus den gespeicherten Snapshots erzeugen (= --mode render)")
+    parser.add_argument('--mode', choices=MODES, help="Betriebsart (Standard: refresh)")
+    parser.add_argument('--sources', nargs='+', choices=SUPPORTED_SOURCES, metavar='SOURCE',
+                        help=f"Nur diese Quellen bearbeiten ({', '.join(SUPPORTED_SOURCES)}; Standard: alle)")
+    args = parser.parse_args()
+    lambda_handler({'force': args.force, 'render_only': args.render_only,
+                    'mode': args.mode, 'sources': args.sources}, None)
@@ -0,0 +1,154 @@
+"""
+Tile positions for the periodic table grid.
+
+A layout shape is a mask of grid cells. The upper part (``vertical``) is
+filled column by column like the main block of the periodic table, the lower
+rows (``horizontal``) are filled row by row like the lanthanide/actinide rows
+below it. Services that don't fit into the shape flow into extra full-width
+rows underneath.
+
+The position table of a shape is built once per container (get_layout() is
+memoized) and shared by all sources. Placing n services is a single pass: the
+table is indexed directly, overflow positions are computed arithmetically and
+grid_rows comes from a precomputed running maximum instead of another scan.
+
+Available layouts (PERIODIC_LAYOUT):
+
+- ``classic``: the original 19 column table
+- ``wide``: 32 columns with the long rows inlined, no rows below the table
+- ``blocks``: one block of rows per category, 19 columns wide
+"""
+from functools import lru_cache
+
+# Rows of the table body, filled column by column ('1' = cell used)
+CLASSIC_VERTICAL = (
+    "1000000000000000011",
+    "1100000000001111111",
+    "1100000000001111111",
+    "1111111111111111111",
+    "1111111111111111111",
+    "1111111111111111111",
+    "1111111111111111111",
+    "1111111111111111111",
+    "1111111111111111111",
+)
+
+# Rows below the body (after one blank row), filled row by row
+CLASSIC_HORIZONTAL = (
+    "0000000000000000000",
+    "0111111111111111111",
+    "0111111111111111111",
+)
+
+WIDE_VERTICAL = (
+    "1" + "0" * 29 + "11",
+    "11" + "0" * 23 + "1" * 7,
+    "11" + "0" * 23 + "1" * 7,
+) + ("1" * 32,) * 6
+
+# Where the legend sits: in the gap at the top of the table body
+DEFAULT_LEGEND = {'column': 3, 'columns': 9, 'row': 2, 'rows': 2}
+
+# Rows returned as grid_rows when there is nothing to place
+DEFAULT_GRID_ROWS = 10
+
+
+class Layout:
+    """
+    Args:
+        vertical: mask rows of the table body, filled column by column
+        horizontal: mask rows below the body, filled row by row
+        legend: grid placement of the legend (column/columns/row/rows)
+    """
+
+    def __init__(self, vertical, horizontal=(), legend=DEFAULT_LEGEND):
+        self.columns = max(len(row) for row in vertical + horizontal)
+        self.legend = dict(legend)
+
+        table = []
+        for col in range(self.columns):
+            for row, cells in enumerate(vertical):
+                if col < len(cells) and cells[col] == '1':
+                    table.append((row + 1, col + 1))
+        first_hrow = len(vertical) + 2
+        for row, cells in enumerate(horizontal):
+            for col, cell in enumerate(cells):
+                if cell == '1':
+                    table.append((first_hrow + row, col + 1))
+        self.table = tuple(table)
+
+        # max_rows[i]: grid rows needed for the first i + 1 positions
+        max_rows, highest = [], 0
+        for row, _ in self.table:
+            highest = max(highest, row)
+            max_rows.append(highest)
+        self.max_rows = tuple(max_rows)
+        self.overflow_row = self.table[-1][0] + 1 if self.table else 1
+
+    def position(self, index):
+        """(row, column) of the index-th service."""
+        if index < len(self.table):
+            return self.table[index]
+        extra = index - len(self.table)
+        return self.overflow_row + extra // self.columns, extra % self.columns + 1
+
+    def grid_rows(self, count):
+        """Grid rows needed to show count services."""
+        if count <= 0:
+            return DEFAULT_GRID_ROWS
+        if count <= len(self.table):
+            return self.max_rows[count - 1]
+        return self.position(count - 1)[0]
+
+    def place(self, periodic):
+        """Set row/column on every service and the grid size on periodic."""
+        index = 0
+        for category in periodic['categories']:
+            for service in category['services']:
+                service['row'], service['column'] = self.position(index)
+                index += 1
+        periodic['grid_rows'] = self.grid_rows(index)
+        periodic['grid_columns'] = self.columns
+        periodic['legend'] = self.legend
+        return periodic
+
+
+class BlockLayout:
+    """
+    One block per category: every category starts on a new row below the
+    legend and fills rows of the given width.
+    """
+
+    def __init__(self, columns=19, first_row=4, legend=None):
+        self.columns = columns
+        self.first_row = first_row
+        self.legend = legend or {'column': 1, 'columns': columns, 'row': 1, 'rows': first_row - 1}
+
+    def place(self, periodic):
+        """Set row/column on every service and the grid size on periodic."""
+        row = self.first_row
+        for category in periodic['categories']:
+            services = category['services']
+            for index, service in enumerate(services):
+                service['row'] = row + index // self.columns
+                service['column'] = index % self.columns + 1
+            row += -(-len(services) // self.columns)
+        periodic['grid_rows'] = row - 1 if row > self.first_row else DEFAULT_GRID_ROWS
+        periodic['grid_columns'] = self.columns
+        periodic['legend'] = self.legend
+        return periodic
+
+
+LAYOUTS = {
+    'classic': lambda: Layout(CLASSIC_VERTICAL, CLASSIC_HORIZONTAL),
+    'wide': lambda: Layout(WIDE_VERTICAL),
+    'blocks': lambda: BlockLayout(),
+}
+
+
+@lru_cache(maxsize=None)
+def get_layout(name='classic'):
+    """Return the (cached) layout called name."""
+    if name not in LAYOUTS:
+        raise ValueError(f"Unknown layout '{name}', expected one of: {', '.join(LAYOUTS)}")
+    return LAYOUTS[name]()
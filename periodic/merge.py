@@ -0,0 +1,85 @@
+"""
+Join several service catalogs (periodic data of the individual sources) into
+one.
+
+Services are matched on a normalized key: the "AWS"/"Amazon" prefix and any
+parenthesized suffix are dropped (as parse_name does), then case and
+punctuation are ignored, so "Amazon Simple Storage Service (S3)", "Simple
+Storage Service" and "simple-storage service" are the same service. Aliases
+map other spellings to one key, e.g. "S3" to "Simple Storage Service" from
+the reserved symbols.
+
+Every service and category is looked up in a dict keyed by its normalized
+name, so joining is a single pass over all catalogs, linear in their size.
+"""
+import re
+
+PREFIX_RE = re.compile(r"^(?:AWS|Amazon)\s*")
+NON_ALNUM_RE = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_key(name):
+    """Matching key of a service or category name."""
+    name = PREFIX_RE.sub('', name or '').split('(', 1)[0]
+    return NON_ALNUM_RE.sub('', name.lower())
+
+
+def build_aliases(*alias_maps):
+    """
+    Key -> key aliases from maps of alternative name -> canonical name
+    (e.g. reserved symbols, preferred short names).
+    """
+    aliases = {}
+    for alias_map in alias_maps:
+        for alternative, canonical in alias_map.items():
+            alias, target = normalize_key(alternative), normalize_key(canonical)
+            if alias and alias != target:
+                aliases.setdefault(alias, target)
+    return aliases
+
+
+def merge_catalogs(catalogs, aliases=None, palette=None):
+    """
+    Merge periodic catalogs, highest priority first.
+
+    A service keeps the position and fields of the first catalog it appears
+    in; later catalogs only fill in a missing link or description, or add
+    services (and categories) the earlier ones don't have.
+
+    Args:
+        catalogs: periodic dicts ({'categories': [{'name', 'class', 'color', 'services'}]})
+        aliases: normalized key -> normalized key (see build_aliases)
+        palette: colors for the merged categories, in order (default: keep the source colors)
+
+    Returns:
+        list of merged categories; services are copies without symbol/row/column
+    """
+    aliases = aliases or {}
+    services_by_key = {}
+    categories_by_key = {}
+
+    for periodic in catalogs:
+        for category in (periodic or {}).get('categories', []):
+            category_key = normalize_key(category['name'])
+            merged_category = categories_by_key.get(category_key)
+            if merged_category is None:
+                color = palette[len(categories_by_key) % len(palette)] if palette else category.get('color')
+                merged_category = categories_by_key[category_key] = {
+                    'name': category['name'], 'class': category['class'], 'color': color, 'services': []}
+
+            for service in category['services']:
+                key = normalize_key(service['name'])
+                key = aliases.get(key, key)
+                existing = services_by_key.get(key)
+                if existing is None:
+                    entry = {field: value for field, value in service.items()
+                             if field not in ('symbol', 'row', 'column')}
+                    entry['category'] = merged_category['class']
+                    services_by_key[key] = entry
+                    merged_category['services'].append(entry)
+                else:
+                    for field in ('link', 'desc'):
+                        if not existing.get(field) and service.get(field):
+                            existing[field] = service[field]
+
+    return [category for category in categories_by_key.values() if category['services']]
@@ -0,0 +1,189 @@
+"""
+Per-invocation metrics in CloudWatch Embedded Metric Format (EMF).
+
+One Metrics object collects everything for a Lambda invocation:
+
+- stage(name): wall time, CPU time and tracemalloc peak of a block; repeated
+  stages (e.g. render once per source) are summed
+- record(name, seconds): wall time measured elsewhere (e.g. per source in
+  the fetch threads)
+- add(name, value, unit): counters such as bytes downloaded/uploaded
+- put(name, value, unit): gauges such as compression ratios
+- prop(name, value): non-metric context (changed sources, publish results)
+
+When the `with` block ends, a single EMF JSON line is printed to stdout,
+where CloudWatch Logs turns it into metrics, and appended to
+PERIODIC_METRICS_FILE if set (local sink for offline runs).
+
+While a Metrics object is active, current_metrics() returns it, so code
+deep in the fetchers can record without passing it around. Lambda runs one
+invocation per container at a time, so a module-level "current" is safe.
+"""
+import json
+import os
+import resource
+import threading
+import time
+import tracemalloc
+
+NAMESPACE = os.environ.get('PERIODIC_METRICS_NAMESPACE', 'PeriodicTable')
+METRICS_FILE = os.environ.get('PERIODIC_METRICS_FILE', '')
+
+# tracemalloc slows down allocation-heavy stages, so it is off unless a debug run
+# sets PERIODIC_TRACE_MEMORY=1 (test_local.py does)
+TRACE_MEMORY = os.environ.get('PERIODIC_TRACE_MEMORY', '0') == '1'
+
+_current = None
+
+
+class Metrics:
+    """
+    Args:
+        function: value of the Function dimension
+        trace_memory: measure tracemalloc peaks per stage and overall
+        sink: file to append the record to (JSON lines), in addition to stdout
+    """
+
+    def __init__(self, function='periodic-table', trace_memory=TRACE_MEMORY, sink=METRICS_FILE):
+        self.function = function
+        self.trace_memory = trace_memory
+        self.sink = sink
+        self.metrics = {}      # name -> [value, unit]
+        self.properties = {}
+        self._lock = threading.Lock()
+        self._started = None
+        # Highest traced memory of the invocation; stages reset tracemalloc's
+        # peak, so the peak before each reset is folded in here
+        self._peak = 0
+
+    def __enter__(self):
+        global _current
+        _current = self
+        self._started = time.perf_counter(), time.process_time()
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        global _current
+        wall, cpu = self._started
+        self.add('total_wall_time', (time.perf_counter() - wall) * 1000, 'Milliseconds')
+        self.add('total_cpu_time', (time.process_time() - cpu) * 1000, 'Milliseconds')
+        if tracemalloc.is_tracing():
+            self.note_peak()
+            self.put('peak_memory', self._peak, 'Bytes')
+            tracemalloc.stop()
+        # ru_maxrss is in kilobytes on Linux
+        self.put('max_rss', resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024, 'Bytes')
+        if exc is not None:
+            self.prop('error', repr(exc))
+        _current = None
+        self.emit()
+        return False
+
+    def note_peak(self):
+        """Fold tracemalloc's current peak into the invocation peak (before it is reset)."""
+        peak = tracemalloc.get_traced_memory()[1]
+        with self._lock:
+            self._peak = max(self._peak, peak)
+
+    def add(self, name, value, unit='Count'):
+        """Add value to a counter."""
+        with self._lock:
+            entry = self.metrics.setdefault(name, [0, unit])
+            entry[0] += value
+
+    def put(self, name, value, unit='None'):
+        """Set a gauge."""
+        with self._lock:
+            self.metrics[name] = [value, unit]
+
+    def prop(self, name, value):
+        """Attach a property to the record (searchable in Logs Insights, not a metric)."""
+        with self._lock:
+            self.properties[name] = value
+
+    def record(self, stage, seconds):
+        """Add a wall time measured by the caller to a stage."""
+        if seconds is not None:
+            self.add(f"{stage}_wall_time", seconds * 1000, 'Milliseconds')
+
+    def stage(self, name):
+        return _Stage(self, name)
+
+    def to_emf(self):
+        metrics = dict(self.metrics)
+        record = {
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': NAMESPACE,
+                    'Dimensions': [['Function']],
+                    'Metrics': [{'Name': name, 'Unit': unit} for name, (_, unit) in metrics.items()],
+                }],
+            },
+            'Function': self.function,
+        }
+        record.update(self.properties)
+        record.update({name: round(value, 3) if isinstance(value, float) else value
+                       for name, (value, _) in metrics.items()})
+        return record
+
+    def emit(self):
+        line = json.dumps(self.to_emf(), separators=(',', ':'), default=str)
+        print(line)
+        if self.sink:
+            try:
+                with open(self.sink, 'a', encoding='utf-8') as f:
+                    f.write(line + '\n')
+            except OSError as e:
+                print(f"Could not write metrics to {self.sink}: {e}")
+
+
+class _Stage:
+    """Context manager timing one stage; memory peaks only for stages run one at a time."""
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        if tracemalloc.is_tracing():
+            self.metrics.note_peak()
+            self._baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        self._wall, self._cpu = time.perf_counter(), time.process_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = (time.perf_counter() - self._wall) * 1000
+        cpu = (time.process_time() - self._cpu) * 1000
+        self.metrics.add(f"{self.name}_wall_time", wall, 'Milliseconds')
+        self.metrics.add(f"{self.name}_cpu_time", cpu, 'Milliseconds')
+        if tracemalloc.is_tracing():
+            peak = tracemalloc.get_traced_memory()[1] - self._baseline
+            with self.metrics._lock:
+                entry = self.metrics.metrics.setdefault(f"{self.name}_peak_memory", [0, 'Bytes'])
+                entry[0] = max(entry[0], peak)
+        return False
+
+
+class _NullMetrics(Metrics):
+    """Stand-in when no invocation is being measured (e.g. debug scripts calling fetchers)."""
+
+    def __init__(self):
+        super().__init__(trace_memory=False, sink='')
+
+    def add(self, name, value, unit='Count'):
+        pass
+
+    def put(self, name, value, unit='None'):
+        pass
+
+    def prop(self, name, value):
+        pass
+
+
+def current_metrics():
+    """The Metrics of the running invocation, or a no-op stand-in."""
+    return _current or _NullMetrics()
@@ -0,0 +1,102 @@
+"""
+Extract the globalNav navigation data from the aws.amazon.com/products/ page.
+
+The page embeds a JSON document starting with {"data":{"items" in a <script>
+tag; its globalNav field is itself a JSON string with the product menu. The
+fast path finds that marker in the raw page text and lets
+json.JSONDecoder.raw_decode() parse exactly one JSON value from there, so no
+DOM is built and string contents containing braces are handled correctly.
+If the marker isn't there (the JSON is formatted differently, or globalNav
+moved to another place in the document), the BeautifulSoup fallback decodes
+every <script> that mentions globalNav as a whole (a JSON document, or the
+value assigned in `x = {...}`) and looks for a globalNav key anywhere in it.
+Pages that don't mention globalNav at all skip the DOM parse.
+"""
+import json
+
+NAV_MARKER = '{"data":{"items"'
+
+_decoder = json.JSONDecoder()
+
+
+def _decode_nav(text, start):
+    data, _ = _decoder.raw_decode(text, start)
+    return json.loads(data['data']['items'][0]['fields']['globalNav'])
+
+
+def _scan(text):
+    start = text.find(NAV_MARKER)
+    while start != -1:
+        try:
+            return _decode_nav(text, start)
+        except (ValueError, KeyError, IndexError, TypeError):
+            start = text.find(NAV_MARKER, start + 1)
+    return None
+
+
+def _find_nav(value):
+    """The globalNav value anywhere in a decoded JSON structure (decoded if it is a string), or None."""
+    stack = [value]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            nav = value.get('globalNav')
+            if isinstance(nav, str):
+                try:
+                    nav = json.loads(nav)
+                except ValueError:
+                    nav = None
+            if isinstance(nav, dict):
+                return nav
+            stack.extend(value.values())
+        elif isinstance(value, list):
+            stack.extend(value)
+    return None
+
+
+def _decode_script(text):
+    text = text.strip()
+    start = 0 if text[:1] in '{[' else text.find('{')
+    if start == -1:
+        return None
+    try:
+        value, _ = _decoder.raw_decode(text, start)
+    except ValueError:
+        return None
+    return value
+
+
+def extract_nav_data_soup(page):
+    """Fallback: decode each <script> mentioning globalNav as a whole and search it for the key."""
+    if isinstance(page, bytes):
+        page = page.decode('utf-8', errors='replace')
+    if 'globalNav' not in page:
+        return None
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(page, 'html.parser')
+    for script in soup.find_all('script'):
+        if script.string and 'globalNav' in script.string:
+            nav_data = _find_nav(_decode_script(script.string))
+            if nav_data:
+                return nav_data
+    return None
+
+
+def extract_nav_data(page):
+    """
+    Return the parsed globalNav dict of a products page, or None.
+
+    Args:
+        page: page content as bytes (e.g. response.content) or str
+    """
+    text = page.decode('utf-8', errors='replace') if isinstance(page, bytes) else page
+    return _scan(text) or extract_nav_data_soup(text)
+
+
+def find_products_menu(nav_data):
+    """Return the 'Products' entry of the navigation, or None."""
+    for item in (nav_data or {}).get('items', []):
+        if item.get('name') == 'Products':
+            return item
+    return None
@@ -0,0 +1,150 @@
+"""
+Normalization of raw Directory API items into compact service records.
+
+Each item is read once: name, description and link come from their field
+fallback chains, the category from a single pass over the tags. Lookup
+tables and regexes are built once at import, category classes and badge
+JSON are memoized, so normalizing thousands of items does no repeated setup
+work. normalize_batches() takes items page by page, so it keeps pace with
+paginated or streamed input.
+"""
+import json
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+# aws-tech-category slugs -> display category
+SLUG_CATEGORIES = {
+    'analytics': 'Analytics', 'data-analytics': 'Analytics',
+    'compute': 'Compute',
+    'storage': 'Storage',
+    'networking-content-dev': 'Networking', 'networking': 'Networking',
+    'devtools': 'Developer Tools', 'developer-tools': 'Developer Tools',
+    'mgmt-govern': 'Management & Governance', 'management-governance': 'Management & Governance',
+    'ai-ml': 'Artificial Intelligence (AI)', 'machine-learning': 'Artificial Intelligence (AI)', 'ai': 'Artificial Intelligence (AI)',
+    'databases': 'Databases',
+    'app-integration': 'Application Integration', 'application-integration': 'Application Integration',
+    'media-services': 'Media Services',
+    'iot': 'Internet of Things',
+    'migration': 'Migration',
+    'euc': 'End-User Computing (EUC)', 'end-user-computing-euc': 'End-User Computing (EUC)',
+    'business-apps': 'Business Applications', 'business-applications': 'Business Applications',
+    'arch-strategy': 'Architecture Strategy', 'architecture-strategy': 'Architecture Strategy',
+    'satellite': 'Aerospace & Satellite', 'aerospace-satellite': 'Aerospace & Satellite',
+    'quantum': 'Quantum Technologies',
+    'blockchain': 'Blockchain',
+    'games': 'Game Tech', 'game-tech': 'Game Tech',
+    'cost-mgmt': 'Cloud Financial Management', 'cloud-financial-management': 'Cloud Financial Management',
+    'serverless': 'Serverless', 'mobile': 'Mobile'
+}
+
+TECHNOLOGY_CATEGORIES = 'GLOBAL#aws-technology-categories'
+TECH_CATEGORY = 'GLOBAL#aws-tech-category'
+DEFAULT_CATEGORY = 'Other'
+
+NAME_RE = re.compile(r"(AWS|Amazon)*\s*(.*)")
+CATEGORY_CLASS_RE = re.compile(r"[&, ]")
+
+NAME_FIELDS = ('title', 'productTitle', 'cardTitle')
+DESC_FIELDS = ('body', 'blurb', 'description')
+LINK_FIELDS = ('ctaLink', 'primaryCTALink', 'secondaryCTALink', 'url')
+NESTED_LINK_FIELDS = ('link', 'learnMoreLink')
+
+# title: name as delivered (used to skip duplicates); name: cleaned name, the symbol input
+ServiceRecord = namedtuple('ServiceRecord', 'title name prefix desc link category category_class')
+
+_EMPTY = {}
+
+
+def parse_name(name):
+    """Split a service name into (prefix, name without prefix and parenthesized suffix)."""
+    search = NAME_RE.search(name)
+    prefix = search.group(1) or 'AWS'
+    return prefix, search.group(2).split("(", 2)[0].strip()
+
+
+@lru_cache(maxsize=None)
+def category_class(name):
+    """CSS class of a category name."""
+    return CATEGORY_CLASS_RE.sub('', name)
+
+
+def friendly_from_slug(slug):
+    return SLUG_CATEGORIES.get(slug.strip().lower()) if isinstance(slug, str) else None
+
+
+@lru_cache(maxsize=1024)
+def _badge_category(badge):
+    try:
+        value = json.loads(badge)
+        labels = value.get('value') if isinstance(value, dict) else None
+        if isinstance(labels, list) and labels:
+            return labels[0]
+    except Exception:
+        pass
+    return None
+
+
+def derive_category_name(item_obj):
+    """
+    Category of a Directory API item: aws-technology-categories (preferred),
+    falling back to aws-tech-category / badge, else 'Other'.
+    """
+    fallback = None
+    for tag in item_obj.get('tags') or ():
+        namespace = tag.get('tagNamespaceId')
+        if namespace == TECHNOLOGY_CATEGORIES:
+            name = tag.get('name')
+            if name:
+                return name
+        elif namespace == TECH_CATEGORY and fallback is None:
+            fallback = friendly_from_slug(tag.get('name', ''))
+    if fallback:
+        return fallback
+    badge = item_obj.get('item', _EMPTY).get('additionalFields', _EMPTY).get('badge')
+    if isinstance(badge, str):
+        category = _badge_category(badge)
+        if category is not None:
+            return category
+    return DEFAULT_CATEGORY
+
+
+def _first(fields, names):
+    for name in names:
+        value = fields.get(name)
+        if value:
+            return value
+    return None
+
+
+def normalize_item(item_obj):
+    """ServiceRecord for one Directory API item, or None if it has no usable name."""
+    item = item_obj.get('item', _EMPTY)
+    fields = item.get('additionalFields', _EMPTY)
+
+    # Prefer the human-readable title, fall back to the slug "item.name"
+    title = _first(fields, NAME_FIELDS) or item.get('title')
+    if not title:
+        slug = item.get('name')
+        if not isinstance(slug, str) or not slug:
+            return None
+        title = slug.replace('-', ' ').replace('_', ' ').title()
+
+    link = _first(fields, LINK_FIELDS)
+    if not link:
+        nested = _first(fields, NESTED_LINK_FIELDS)
+        if isinstance(nested, dict):
+            link = nested.get('href')
+        elif isinstance(nested, str):
+            link = nested
+
+    category = derive_category_name(item_obj)
+    prefix, name = parse_name(title)
+    return ServiceRecord(title, name, prefix, _first(fields, DESC_FIELDS) or '', link or '',
+                         category, category_class(category))
+
+
+def normalize_batches(batches):
+    """Yield a list of ServiceRecords per batch (e.g. API page) of raw items."""
+    for batch in batches:
+        yield [record for record in map(normalize_item, batch) if record is not None]
@@ -0,0 +1,134 @@
+"""
+Precompressed variants of the published pages.
+
+Every page is stored once per content encoding: gzip under the page key
+itself (what every client gets by default), brotli as a sibling object with
+a `.br` suffix. S3 can't negotiate encodings, so the CloudFront function in
+infrastructure/cloudfront.yaml rewrites requests from clients that accept br
+to the `.br` object.
+
+Brotli needs the `brotli` package (or `brotlicffi`), installed for the
+Lambda runtime by deploy.sh and infrastructure/build.sh. Without it the
+`.br` object is a copy of the gzip object (Content-Encoding gzip, which
+every client that sends `br` also accepts), so the sibling CloudFront
+rewrites to never goes missing or stale; the publisher copies it within S3
+rather than compressing and uploading the page twice.
+
+Pages smaller than MIN_COMPRESS_SIZE (PERIODIC_MIN_COMPRESS_SIZE bytes) are
+stored uncompressed under every key: container headers and dictionaries
+would make e.g. a short JSON changelog bigger than the page itself.
+
+Levels come from the size/time table `debug/benchmark.py` prints for the
+rendered pages (see README, "Compression levels"); the defaults are where
+the size gains flatten out relative to CPU time.
+"""
+import os
+import tempfile
+import zlib
+from collections import namedtuple
+
+# Characters encoded/compressed per step, spooled output kept in memory up to SPOOL_SIZE
+CHUNK_CHARS = 64 * 1024
+SPOOL_SIZE = 1024 * 1024
+
+GZIP_LEVEL = int(os.environ.get('PERIODIC_GZIP_LEVEL', '6'))
+BROTLI_LEVEL = int(os.environ.get('PERIODIC_BROTLI_LEVEL', '9'))
+
+# Smaller pages (UTF-8 bytes) are stored without compression
+MIN_COMPRESS_SIZE = int(os.environ.get('PERIODIC_MIN_COMPRESS_SIZE', '1024'))
+
+# name: Content-Encoding value; suffix: appended to the page key (gzip is the page itself)
+Encoding = namedtuple('Encoding', 'name suffix levels')
+
+ENCODINGS = {
+    'gzip': Encoding('gzip', '', range(1, 10)),
+    'br': Encoding('br', '.br', range(0, 12)),
+}
+
+DEFAULT_LEVELS = {'gzip': GZIP_LEVEL, 'br': BROTLI_LEVEL}
+
+# Used for the remaining pages when an invocation runs short of time
+FAST_LEVELS = {'gzip': 1, 'br': 4}
+
+# Comma-separated subset of ENCODINGS; gzip is always produced
+CONFIGURED_ENCODINGS = ['gzip'] + [name for name in os.environ.get('PERIODIC_ENCODINGS', 'gzip,br').split(',')
+                                   if name.strip() in ENCODINGS and name.strip() != 'gzip']
+
+_brotli = None
+
+
+def brotli_module():
+    """The brotli implementation, or None if neither brotli nor brotlicffi is installed."""
+    global _brotli
+    if _brotli is None:
+        try:
+            import brotli
+        except ImportError:
+            try:
+                import brotlicffi as brotli
+            except ImportError:
+                brotli = False
+        _brotli = brotli
+    return _brotli or None
+
+
+def available(name):
+    return name == 'gzip' or (name == 'br' and brotli_module() is not None)
+
+
+class _Gzip:
+
+    def __init__(self, level):
+        # wbits 31: gzip container; the header carries no timestamp, so output is reproducible
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+
+class _Brotli:
+
+    def __init__(self, level):
+        self._compressor = brotli_module().Compressor(quality=level, mode=brotli_module().MODE_TEXT)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.finish()
+
+
+_COMPRESSORS = {'gzip': _Gzip, 'br': _Brotli}
+
+
+def iter_encoded(html, chunk_chars=CHUNK_CHARS):
+    """UTF-8 bytes of html, chunk by chunk."""
+    for start in range(0, len(html), chunk_chars):
+        yield html[start:start + chunk_chars].encode('utf-8')
+
+
+def compress_spool(html, name='gzip', level=None):
+    """
+    Compress html incrementally into a spooled buffer (in memory while
+    small, a temporary file beyond SPOOL_SIZE).
+
+    Returns:
+        (buffer positioned at 0, compressed size)
+    """
+    compressor = _COMPRESSORS[name](DEFAULT_LEVELS[name] if level is None else level)
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    for chunk in iter_encoded(html):
+        spool.write(compressor.compress(chunk))
+    spool.write(compressor.flush())
+    size = spool.tell()
+    spool.seek(0)
+    return spool, size
+
+
+def compress(data, name='gzip', level=None):
+    """Compress bytes in one call (benchmarks, small payloads)."""
+    compressor = _COMPRESSORS[name](DEFAULT_LEVELS[name] if level is None else level)
+    return compressor.compress(data) + compressor.flush()
@@ -0,0 +1,389 @@
+"""
+Publish stage: write rendered pages to S3 or the local filesystem.
+
+Every page is identified by the SHA-256 of its HTML. Before uploading, the
+hash is compared with the one stored on the existing object (S3 user metadata
+`content-sha256`, or the file on disk), and unchanged pages are skipped
+without being compressed. Strings that change on every run without the data
+changing (the "Last Update" date) are passed as `volatile` and left out of
+the S3 hash (locally, the file may differ from the page only where they are),
+so a page whose data didn't change isn't re-uploaded by the next day's run
+either; it keeps the date of the run that last changed it. Aliases such as
+index.html are created from the already published page with a server-side
+copy instead of a second compress-and-upload.
+
+Pages are streamed: publish() takes them one at a time (e.g. from a
+generator that renders them) and keeps only a bounded number queued. A page
+is encoded chunk by chunk into a compressor whose output goes to a spooled
+buffer (in memory while small, a temporary file beyond that), which is
+uploaded directly, with a multipart upload when it is large. No full byte
+copy of a page or its compressed form is ever held, and each page is released
+once uploaded, so peak memory doesn't grow with the number of pages.
+
+On S3 every page is stored in each configured encoding (gzip under its own
+key, brotli as `<key>.br`, see precompress). The encodings are recorded in
+the `content-encodings` metadata next to the hash, so enabling one (or
+installing brotli) re-publishes unchanged pages once. Pages below
+MIN_COMPRESS_SIZE are stored uncompressed under the same keys (`identity`).
+
+Static assets are content-addressed (the hash is part of the key), so an
+asset that already exists never needs to be uploaded again.
+"""
+import hashlib
+import io
+import os
+import re
+import shutil
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from assets import ASSET_CACHE_CONTROL
+from precompress import (CONFIGURED_ENCODINGS, DEFAULT_LEVELS, ENCODINGS, MIN_COMPRESS_SIZE, SPOOL_SIZE, available,
+                         compress_spool, iter_encoded)
+
+PAGE_CACHE_CONTROL = 'public, max-age=2592000'
+
+# Content type of a published page by extension (e.g. the JSON changelog next to the HTML)
+PAGE_CONTENT_TYPES = {'.html': 'text/html', '.json': 'application/json'}
+
+# Content-addressed asset keys known to exist, kept across warm invocations
+_published_assets = set()
+
+# status: 'uploaded', 'copied', 'unchanged' or 'failed'; compressed_size is the
+# gzip size, variants maps every stored encoding to its size (both None for a page
+# stored uncompressed); compress_time in seconds
+PublishResult = namedtuple('PublishResult', 'key status size compressed_size error compress_time variants',
+                           defaults=(None, None))
+
+# Multipart upload from this many compressed bytes on
+MULTIPART_THRESHOLD = 8 * 1024 * 1024
+
+# Longest text a local file may have where the page has a volatile string
+MAX_VOLATILE_LENGTH = 64
+
+
+def content_digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def page_digest(html, volatile=()):
+    """
+    (SHA-256 hex digest, UTF-8 size) of html without encoding it as a whole.
+
+    Args:
+        volatile: strings left out of the digest (not of the size)
+    """
+    digest, size = hashlib.sha256(), 0
+    for chunk in iter_encoded(html):
+        size += len(chunk)
+    for text in volatile:
+        if text:
+            html = html.replace(text, '')
+    for chunk in iter_encoded(html):
+        digest.update(chunk)
+    return digest.hexdigest(), size
+
+
+def publish_bounded(publish_page, pages, pool, max_pending):
+    """
+    Run publish_page(key, html) for pages ((key, html) pairs, consumed lazily)
+    on pool, with at most max_pending pages waiting or uploading while the
+    next one is produced.
+
+    Returns:
+        dict of key -> publish_page result, in page order
+    """
+    outcomes = {}
+    pending = deque()
+    for key, html in pages:
+        pending.append((key, pool.submit(publish_page, key, html)))
+        while len(pending) > max_pending:
+            done_key, future = pending.popleft()
+            outcomes[done_key] = future.result()
+    for done_key, future in pending:
+        outcomes[done_key] = future.result()
+    return outcomes
+
+
+def publish_aliases(publisher, published_digest, aliases):
+    """Alias copies of already published pages; a page that isn't published (in its current form) fails."""
+    results = []
+    for alias, source in aliases.items():
+        digest = published_digest(source)
+        if digest is None:
+            results.append(PublishResult(alias, 'failed', None, None, LookupError(f"{source} is not published")))
+        else:
+            results.append(publisher._publish_alias(alias, source, digest))
+    return results
+
+
+class S3Publisher:
+    """
+    Upload precompressed pages to a bucket, skipping unchanged objects.
+
+    Args:
+        encodings: content encodings to store (default: PERIODIC_ENCODINGS)
+        levels: encoding -> compression level (default: PERIODIC_GZIP_LEVEL / PERIODIC_BROTLI_LEVEL)
+        max_pending: rendered pages queued or uploading while the next one is
+            produced (bounds memory when pages come from a generator)
+        volatile: strings in the pages left out of their hash (e.g. today's date)
+    """
+
+    def __init__(self, client, bucket, max_workers=4, encodings=None, levels=None, max_pending=1, volatile=()):
+        self.client = client
+        self.volatile = tuple(volatile)
+        self.bucket = bucket
+        self.max_workers = max_workers
+        self.encodings = list(encodings or CONFIGURED_ENCODINGS)
+        self.levels = {**DEFAULT_LEVELS, **(levels or {})}
+        self.max_pending = max_pending
+        missing = [name for name in self.encodings if not available(name)]
+        if missing:
+            print(f"Encodings {', '.join(missing)} not available, storing gzip in their place")
+        # e.g. 'gzip,br', or 'gzip,br:gzip' while brotli is missing (re-published once it is installed)
+        self._metadata_encodings = ','.join(name if name not in missing else f"{name}:gzip"
+                                            for name in self.encodings)
+
+    def _head(self, key):
+        from botocore.exceptions import ClientError  # only needed (and installed) with boto3
+
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+
+    def _remote_digest(self, key):
+        """Hash of the published page, if it was stored with the current encodings."""
+        head = self._head(key)
+        metadata = head.get('Metadata', {}) if head else {}
+        if metadata.get('content-encodings', 'gzip') not in (self._metadata_encodings, 'identity'):
+            return None
+        return metadata.get('content-sha256')
+
+    def _publish_asset(self, key, asset):
+        try:
+            if (self.bucket, key) in _published_assets or self._head(key):
+                _published_assets.add((self.bucket, key))
+                return PublishResult(key, 'unchanged', len(asset.data), None, None)
+            self.client.put_object(
+                ContentType=asset.content_type,
+                CacheControl=ASSET_CACHE_CONTROL,
+                Body=asset.data,
+                Bucket=self.bucket,
+                Key=key)
+            _published_assets.add((self.bucket, key))
+            return PublishResult(key, 'uploaded', len(asset.data), None, None)
+        except Exception as e:
+            return PublishResult(key, 'failed', None, None, e)
+
+    def publish_assets(self, assets):
+        """Upload content-addressed assets ({key: Asset}) that don't exist yet."""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            return list(pool.map(lambda item: self._publish_asset(*item), assets.items()))
+
+    def _upload(self, key, body, size, **extra):
+        if size >= MULTIPART_THRESHOLD:
+            self.client.upload_fileobj(body, self.bucket, key, ExtraArgs=extra)
+        else:
+            self.client.put_object(Body=body, ContentLength=size, Bucket=self.bucket, Key=key, **extra)
+
+    def _publish_page(self, key, html):
+        try:
+            digest, size = page_digest(html, self.volatile)
+            if self._remote_digest(key) == digest:
+                return PublishResult(key, 'unchanged', size, None, None), digest
+            content_type = PAGE_CONTENT_TYPES.get(os.path.splitext(key)[1], 'text/html')
+            if size < MIN_COMPRESS_SIZE:
+                self._publish_uncompressed(key, html, size, digest, content_type)
+                return PublishResult(key, 'uploaded', size, None, None, 0.0), digest
+            # Variants first: the page key (and its hash) is written last, so a
+            # failed run never leaves a page that looks current next to stale variants
+            variants, compress_time = {}, 0.0
+            stored = {}
+            for name in sorted(self.encodings, key=lambda name: name == 'gzip'):
+                encoding = name if available(name) else 'gzip'
+                if encoding in stored:
+                    # Same bytes as an object uploaded above (gzip in place of a
+                    # missing brotli): copy it within S3 instead of uploading twice
+                    source, variants[name] = stored[encoding]
+                    self.client.copy_object(
+                        CopySource={'Bucket': self.bucket, 'Key': source},
+                        MetadataDirective='COPY',
+                        Bucket=self.bucket,
+                        Key=key + ENCODINGS[name].suffix)
+                    continue
+                started = time.perf_counter()
+                spool, variants[name] = compress_spool(html, encoding, self.levels[encoding])
+                compress_time += time.perf_counter() - started
+                with spool:
+                    self._upload(key + ENCODINGS[name].suffix, spool, variants[name],
+                                 ContentType=content_type,
+                                 ContentEncoding=encoding,
+                                 CacheControl=PAGE_CACHE_CONTROL,
+                                 Metadata={'content-sha256': digest, 'content-encodings': self._metadata_encodings})
+                stored[encoding] = key + ENCODINGS[name].suffix, variants[name]
+            return PublishResult(key, 'uploaded', size, variants['gzip'], None, compress_time, variants), digest
+        except Exception as e:
+            return PublishResult(key, 'failed', None, None, e), None
+
+    def _publish_uncompressed(self, key, html, size, digest, content_type):
+        # One upload without Content-Encoding, copied to the variant keys
+        # (CloudFront still rewrites br requests to <key>.br); the page key last
+        keys = [key + ENCODINGS[name].suffix for name in sorted(self.encodings, key=lambda name: name == 'gzip')]
+        self._upload(keys[0], io.BytesIO(html.encode('utf-8')), size,
+                     ContentType=content_type,
+                     CacheControl=PAGE_CACHE_CONTROL,
+                     Metadata={'content-sha256': digest, 'content-encodings': 'identity'})
+        for target in keys[1:]:
+            self.client.copy_object(
+                CopySource={'Bucket': self.bucket, 'Key': keys[0]},
+                MetadataDirective='COPY',
+                Bucket=self.bucket,
+                Key=target)
+
+    def _publish_alias(self, alias, source, digest):
+        try:
+            if self._remote_digest(alias) == digest:
+                return PublishResult(alias, 'unchanged', None, None, None)
+            # MetadataDirective COPY keeps encoding, cache policy and content hash;
+            # the alias itself is copied last, like the page in _publish_page
+            for name in sorted(self.encodings, key=lambda name: name == 'gzip'):
+                suffix = ENCODINGS[name].suffix
+                self.client.copy_object(
+                    CopySource={'Bucket': self.bucket, 'Key': source + suffix},
+                    MetadataDirective='COPY',
+                    Bucket=self.bucket,
+                    Key=alias + suffix)
+            return PublishResult(alias, 'copied', None, None, None)
+        except Exception as e:
+            return PublishResult(alias, 'failed', None, None, e)
+
+    def publish(self, pages, aliases=None):
+        """
+        Args:
+            pages: dict of object key -> rendered HTML, or an iterable of
+                (key, html) pairs, e.g. a generator rendering them one by one
+            aliases: dict of alias key -> key in pages it should be a copy of
+
+        Returns:
+            list of PublishResult, pages first, then aliases
+        """
+        pages = pages.items() if isinstance(pages, dict) else pages
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            outcomes = publish_bounded(self._publish_page, pages, pool, self.max_pending)
+
+        results = [result for result, _ in outcomes.values()]
+        for alias, source in (aliases or {}).items():
+            result, digest = outcomes.get(source, (None, None))
+            if digest:
+                results.append(self._publish_alias(alias, source, digest))
+        return results
+
+    def publish_aliases(self, aliases):
+        """Copy pages published by an earlier run to their aliases ({alias: key})."""
+        return publish_aliases(self, self._remote_digest, aliases)
+
+
+class LocalPublisher:
+    """
+    Write pages to the local filesystem, skipping files whose content is unchanged.
+
+    Args:
+        volatile: strings in the pages that don't count as a change (e.g. today's
+            date); a file that differs from the page only where they are (short
+            text without markup, such as another day's date) is unchanged
+    """
+
+    def __init__(self, volatile=()):
+        self.volatile = tuple(text for text in volatile if text)
+
+    def _local_digest(self, path):
+        try:
+            digest = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(SPOOL_SIZE), b''):
+                    digest.update(chunk)
+            return digest.hexdigest()
+        except FileNotFoundError:
+            return None
+
+    def _differs_only_in_volatile(self, path, html):
+        parts = re.split('|'.join(map(re.escape, self.volatile)), html)
+        if len(parts) == 1:
+            return False
+        try:
+            with open(path, encoding='utf-8') as f:
+                current = f.read()
+        except (FileNotFoundError, UnicodeDecodeError):
+            return False
+        if not current.startswith(parts[0]) or not current.endswith(parts[-1]):
+            return False
+        # Walk the text between the volatile strings; what the file has in their
+        # place must be short and free of markup
+        pos, end = len(parts[0]), len(current) - len(parts[-1])
+        for part in parts[1:-1]:
+            found = current.find(part, pos, min(end, pos + MAX_VOLATILE_LENGTH + len(part)))
+            if found < 0 or '<' in current[pos:found]:
+                return False
+            pos = found + len(part)
+        return pos <= end <= pos + MAX_VOLATILE_LENGTH and '<' not in current[pos:end]
+
+    def _publish_page(self, path, html):
+        try:
+            digest, size = page_digest(html)
+            local_digest = self._local_digest(path)
+            if local_digest == digest:
+                return PublishResult(path, 'unchanged', size, None, None), digest
+            if local_digest and self.volatile and self._differs_only_in_volatile(path, html):
+                # The file keeps its date, aliases compare against what is on disk
+                return PublishResult(path, 'unchanged', size, None, None), local_digest
+            output_dir = os.path.dirname(path)
+            if output_dir:
+                os.makedirs(output_dir, exist_ok=True)
+            with open(path, 'wb') as f:
+                for chunk in iter_encoded(html):
+                    f.write(chunk)
+            return PublishResult(path, 'uploaded', size, None, None), digest
+        except Exception as e:
+            return PublishResult(path, 'failed', None, None, e), None
+
+    def publish_assets(self, assets):
+        results = []
+        for path, asset in assets.items():
+            try:
+                if os.path.exists(path):
+                    results.append(PublishResult(path, 'unchanged', len(asset.data), None, None))
+                    continue
+                os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+                with open(path, 'wb') as f:
+                    f.write(asset.data)
+                results.append(PublishResult(path, 'uploaded', len(asset.data), None, None))
+            except Exception as e:
+                results.append(PublishResult(path, 'failed', None, None, e))
+        return results
+
+    def publish(self, pages, aliases=None):
+        pages = pages.items() if isinstance(pages, dict) else pages
+        outcomes = {path: self._publish_page(path, html) for path, html in pages}
+
+        results = [result for result, _ in outcomes.values()]
+        for alias, source in (aliases or {}).items():
+            result, digest = outcomes.get(source, (None, None))
+            if digest:
+                results.append(self._publish_alias(alias, source, digest))
+        return results
+
+    def _publish_alias(self, alias, source, digest):
+        try:
+            if self._local_digest(alias) == digest:
+                return PublishResult(alias, 'unchanged', None, None, None)
+            shutil.copyfile(source, alias)
+            return PublishResult(alias, 'copied', None, None, None)
+        except Exception as e:
+            return PublishResult(alias, 'failed', None, None, e)
+
+    def publish_aliases(self, aliases):
+        return publish_aliases(self, self._local_digest, aliases)
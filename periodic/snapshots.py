@@ -0,0 +1,62 @@
+"""
+Versioned snapshots of the normalized source data.
+
+Every run that fetches a changed source stores its `periodic` dict (services
+with their symbols, before layout) as snapshots/<source>.json in the state
+store, next to the source cache. Snapshots are staged on the SourceCache, so
+like the cache they are only written once the pages are published.
+
+A render-only run ({"mode": "render"}, or `lambda_handler.py --render-only`)
+rebuilds all pages from the snapshots without fetching anything, e.g. after
+a template- or layout-only change.
+
+Only datasets that pass fallback.check_dataset() are snapshotted, so the
+snapshot is also the last good state a failing source falls back to.
+
+SNAPSHOT_VERSION is bumped whenever the shape of the normalized data
+changes; older snapshots are then ignored until the next fetching run
+replaces them.
+"""
+import hashlib
+import json
+from datetime import datetime, timezone
+
+SNAPSHOT_VERSION = 1
+
+
+def snapshot_name(source):
+    return f"snapshots/{source}.json"
+
+
+def save_snapshot(cache, source, periodic):
+    """Stage the snapshot of a source's normalized data (written on cache.commit())."""
+    body = json.dumps(periodic, sort_keys=True, separators=(',', ':'))
+    cache.stage_json(snapshot_name(source), {
+        'version': SNAPSHOT_VERSION,
+        'source': source,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'sha256': hashlib.sha256(body.encode('utf-8')).hexdigest(),
+        'periodic': periodic,
+    })
+
+
+def load_snapshot(cache, source):
+    """The normalized data of source from its snapshot, or None if there is no usable one."""
+    snapshot = cache.load_json(snapshot_name(source))
+    if snapshot is None:
+        return None
+    if snapshot.get('version') != SNAPSHOT_VERSION:
+        print(f"Snapshot {source}: version {snapshot.get('version')} is outdated "
+              f"(current: {SNAPSHOT_VERSION}), ignored")
+        return None
+    return snapshot['periodic']
+
+
+def load_snapshots(cache, sources):
+    """{source: normalized data} for every source with a usable snapshot."""
+    data_by_source = {}
+    for source in sources:
+        periodic = load_snapshot(cache, source)
+        if periodic is not None:
+            data_by_source[source] = periodic
+    return data_by_source
@@ -0,0 +1,195 @@
+"""
+Conditional-GET cache for the raw source payloads.
+
+Every response is stored together with its ETag / Last-Modified validators, so
+the next run can ask the server with If-None-Match / If-Modified-Since and get
+a cheap 304 when nothing changed. In addition, a content hash of each
+normalized dataset is kept, which catches sources that don't support
+validators but still return the same data.
+
+Nothing is written until commit() is called, so a run that fails half-way
+never marks its sources as "unchanged" for the next one. Other per-run state
+(e.g. the symbol registry) can be staged with stage_json() to share the same
+commit-after-publish lifecycle.
+
+Each source fetches through its own SourceView. When a source fails, the
+view's staged payloads are dropped, so the next run revalidates against the
+state of the last good fetch instead of getting a 304 for the broken one.
+"""
+import hashlib
+import json
+import threading
+
+
+class CachedResponse:
+    """The parts of a requests.Response the fetchers use, plus a 304 flag."""
+
+    def __init__(self, content, not_modified=False):
+        self.content = content
+        self.not_modified = not_modified
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class SourceCache:
+    """
+    Args:
+        store: LocalStore/S3Store to persist payloads in, or None to disable
+            caching (plain pass-through GETs)
+        revalidate: send conditional requests and compare dataset hashes;
+            False forces a full refresh but still records the new state
+    """
+
+    def __init__(self, store=None, revalidate=True):
+        self.store = store
+        self.revalidate = revalidate and store is not None
+        self._pending = {}
+        self._lock = threading.Lock()
+        # Traffic of this run: response bytes received and 304 answers
+        self.bytes_downloaded = 0
+        self.not_modified = 0
+
+    def _read(self, name):
+        try:
+            return self.store.get(name)
+        except Exception as e:
+            print(f"Cache read failed for {name}: {e}")
+            return None
+
+    def _stage(self, name, data):
+        if self.store is not None:
+            with self._lock:
+                self._pending[name] = data
+
+    def _unstage(self, names):
+        with self._lock:
+            for name in names:
+                self._pending.pop(name, None)
+
+    def _count(self, size, not_modified=0):
+        with self._lock:
+            self.bytes_downloaded += size
+            self.not_modified += not_modified
+
+    def get(self, url, fetch, headers=None, **kwargs):
+        """GET url via fetch(), revalidating against the cached copy."""
+        return self._get(url, fetch, headers, kwargs, self.revalidate, self._stage)
+
+    def _get(self, url, fetch, headers, kwargs, revalidate, stage):
+        key = 'http/' + hashlib.sha1(url.encode('utf-8')).hexdigest()
+        request_headers = dict(headers or {})
+
+        meta = None
+        if revalidate:
+            raw_meta = self._read(key + '.json')
+            meta = json.loads(raw_meta) if raw_meta else None
+        if meta:
+            if meta.get('etag'):
+                request_headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                request_headers['If-Modified-Since'] = meta['last_modified']
+
+        resp = fetch(url, headers=request_headers, **kwargs)
+        if resp.status_code == 304 and meta:
+            body = self._read(key + '.body')
+            if body is not None:
+                self._count(0, not_modified=1)
+                return CachedResponse(body, not_modified=True)
+            # Validators without a body: fall back to an unconditional request
+            resp = fetch(url, headers=headers, **kwargs)
+        resp.raise_for_status()
+        self._count(len(resp.content))
+
+        validators = {
+            'etag': resp.headers.get('ETag'),
+            'last_modified': resp.headers.get('Last-Modified'),
+        }
+        if any(validators.values()):
+            stage(key + '.json', json.dumps(validators).encode('utf-8'))
+            stage(key + '.body', resp.content)
+        return CachedResponse(resp.content)
+
+    def dataset_changed(self, source, data):
+        """Record the hash of a normalized dataset and report whether it differs from the last run."""
+        digest = hashlib.sha256(
+            json.dumps(data, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        ).hexdigest()
+        name = f"datasets/{source}.sha256"
+        previous = self._read(name) if self.revalidate else None
+        self._stage(name, digest.encode('utf-8'))
+        return previous is None or previous.decode('utf-8') != digest
+
+    def invalidate_dataset(self, source):
+        """Make the next run see the data of source as changed (e.g. its page wasn't published)."""
+        self._stage(f"datasets/{source}.sha256", b'')
+
+    def load_json(self, name):
+        """Read a JSON document persisted by an earlier run (None if missing)."""
+        if self.store is None:
+            return None
+        raw = self._read(name)
+        return json.loads(raw) if raw else None
+
+    def stage_json(self, name, data):
+        """Persist a JSON document on commit()."""
+        self._stage(name, json.dumps(data, sort_keys=True).encode('utf-8'))
+
+    def stage_delete(self, name):
+        """Delete a persisted document on commit()."""
+        self._stage(name, None)
+
+    def for_source(self, revalidate=True):
+        """A SourceView for the fetches of one source."""
+        return SourceView(self, revalidate)
+
+    def commit(self):
+        """Persist everything recorded during this run."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for name, data in pending.items():
+            if data is None:
+                self.store.delete(name)
+            else:
+                self.store.put(name, data)
+
+
+class SourceView:
+    """
+    The SourceCache as one source's fetcher sees it.
+
+    Args:
+        cache: the SourceCache of the run
+        revalidate: False fetches unconditionally (e.g. after a failed run)
+            while the rest of the run still revalidates
+    """
+
+    def __init__(self, cache, revalidate=True):
+        self.cache = cache
+        self.revalidate = revalidate and cache.revalidate
+        self._staged = set()
+        self._discarded = False
+        self._lock = threading.Lock()
+
+    def _stage(self, name, data):
+        with self._lock:
+            if self._discarded:
+                return
+            self._staged.add(name)
+        self.cache._stage(name, data)
+
+    def get(self, url, fetch, headers=None, **kwargs):
+        return self.cache._get(url, fetch, headers, kwargs, self.revalidate, self._stage)
+
+    def stage_json(self, name, data):
+        self._stage(name, json.dumps(data, sort_keys=True).encode('utf-8'))
+
+    def discard(self):
+        """Drop everything this source staged, including what a still running fetch stages later."""
+        with self._lock:
+            self._discarded = True
+            staged, self._staged = self._staged, set()
+        self.cache._unstage(staged)
+
+    def __getattr__(self, name):
+        return getattr(self.cache, name)
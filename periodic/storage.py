@@ -0,0 +1,56 @@
+"""
+Small blob stores for state that has to survive between runs (source cache,
+symbol registry, snapshots). Lambda containers don't keep /tmp around, so in
+Lambda the state lives under a prefix in the output bucket; local runs use a
+directory on disk.
+"""
+import os
+
+
+class LocalStore:
+    """Store blobs as files below a local directory."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def get(self, name):
+        try:
+            with open(os.path.join(self.root, name), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, name, data):
+        path = os.path.join(self.root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+
+    def delete(self, name):
+        try:
+            os.remove(os.path.join(self.root, name))
+        except FileNotFoundError:
+            pass
+
+
+class S3Store:
+    """Store blobs as objects below a key prefix in an S3 bucket."""
+
+    def __init__(self, client, bucket, prefix):
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def get(self, name):
+        try:
+            obj = self.client.get_object(Bucket=self.bucket, Key=self.prefix + name)
+        except self.client.exceptions.NoSuchKey:
+            return None
+        return obj['Body'].read()
+
+    def put(self, name, data):
+        self.client.put_object(Bucket=self.bucket, Key=self.prefix + name, Body=data,
+                               CacheControl='no-store')
+
+    def delete(self, name):
+        self.client.delete_object(Bucket=self.bucket, Key=self.prefix + name)
@@ -0,0 +1,178 @@
+"""
+Symbol allocation for the periodic table tiles.
+
+A SymbolAllocator is created fresh for every data source on every run, so
+symbols never leak between sources or between warm Lambda invocations. The
+allocation rules are the ones the handler has always used:
+
+1. Use a pre-defined symbol (reserved_symbols)
+2. Create a 2 letter symbol from the first letters / following letters of the
+   words in the name
+3. Fall back to the first letter alone, then the first letter plus a suffix
+   sequence (handles 1-letter names and exhausted pairs)
+
+Taken symbols are kept in a dict index, the candidates of a name are
+generated lazily (up to the first free one), and the fallback sequence keeps
+a cursor per first letter, so allocating thousands of names stays linear
+instead of rescanning the same taken symbols over and over.
+
+An optional registry (name -> symbol from the previous run) keeps symbols
+stable from month to month: registry symbols are held back for their services
+and only released when a service disappears. Reserved symbols are held back
+too, so no earlier name takes e.g. "L" before Lambda comes along.
+
+Without a registry (the first run after enabling it, or
+PERIODIC_SYMBOL_REGISTRY=0) reserved symbols are not held back, which is the
+order the handler has always assigned symbols in: the first run publishes the
+same symbols as before and seeds the registry with them. A name that took a
+reserved symbol before its service came along (both tiles showed it) then
+gets a new symbol once, on the next run, without moving any other service.
+"""
+import re
+import time
+
+# Reserve keywords for special cases, including single and 3-letter symbols
+reserved_symbols = {
+  "Mx"  : "Apache MXNet on AWS",
+  "Tf"  : "TensorFlow on AWS",
+  "Eks" : "Elastic Container Service for Kubernetes",
+  "Ecs" : "Elastic Container Service",
+  "Db"  : "DocumentDB",
+  "53"  : "Route 53",
+  "X"   : "X-Ray",
+  "Ami" : "Deep Learning AMIs",
+  "Phd" : "Personal Health Dashboard",
+  "Cs"  : "CloudSearch",
+  "L"   : "Lambda",
+  "S3"  : "Simple Storage Service",
+  "A"   : "Athena",
+  "Vpc" : "VPC",
+  "Ec2" : "EC2",
+  "C9"  : "Cloud9",
+  "Gt"  : "SageMaker Ground Truth",
+  "Sns" : "Simple Notification Service",
+  "Sqs" : "Simple Queue Service",
+  "Hsm" : "CloudHSM",
+  "Ebs" : "Elastic Block Store",
+  "Cli" : "Command Line Interface",
+  "Cf"  : "CloudFront",
+  "Cm"  : "Cloud Map",
+  "Gl"  : "S3 Glacier",
+  "Sdk" : "Tools and SDKs",
+  "Lx"  : "Lex",
+  "M"   : "Macie",
+  "K"   : "Managed Streaming for Kafka",
+  "Emr" : "EMR",
+  "F"   : "Fargate"
+}
+
+CLEAN_RE = re.compile(r"[&,-/.]")
+
+# Suffixes appended to the first letter when no pair from the name is free:
+# the original 55 two-letter suffixes first, then two-character suffixes
+_BASE_SUFFIXES = tuple('abcdefghijklmnopqrstuvwxyz') + tuple('ABCDEFGHIJKLMNOPQRSTUVWXYZ') + ('1', '2', '3')
+FALLBACK_SUFFIXES = _BASE_SUFFIXES + tuple(a + b for a in _BASE_SUFFIXES for b in _BASE_SUFFIXES)
+
+
+def candidate_symbols(chars, taken=()):
+    """Yield the 2-letter candidates of a character pool that are not in taken, in order."""
+    # First char (upper) combined with each following char (lower). A repeated
+    # first char only yields pairs its first occurrence already produced.
+    lower = chars.lower()
+    for idx, char in enumerate(lower):
+        if char not in lower[:idx]:
+            first = char.upper()
+            for follower in lower[idx + 1:]:
+                candidate = first + follower
+                if candidate not in taken:
+                    yield candidate
+
+
+class SymbolAllocator:
+    """
+    Args:
+        reserved: symbol -> name map of pre-defined symbols
+        registry: name -> symbol map from a previous run (optional)
+        hold_reserved: keep reserved symbols free for their services from the
+            start (default: only with a registry, see above)
+    """
+
+    def __init__(self, reserved=reserved_symbols, registry=None, hold_reserved=None):
+        self.reserved = {name: symbol for symbol, name in reserved.items()}
+        self.registry = dict(registry or {})
+        if hold_reserved is None:
+            hold_reserved = registry is not None
+        # Symbols other names must not get: reserved ones and those held by registry entries
+        self.held = {symbol: name for symbol, name in reserved.items()} if hold_reserved else {}
+        for name, symbol in self.registry.items():
+            self.held.setdefault(symbol, name)
+        self.taken = {}      # symbol -> name
+        self.assigned = {}   # name -> symbol
+        self._fallback_pos = {}
+        self.elapsed = 0.0   # seconds spent generating symbols
+
+    def _free(self, symbol, name):
+        return symbol not in self.taken and self.held.get(symbol, name) == name
+
+    def _take(self, symbol, name):
+        self.taken[symbol] = name
+        self.assigned[name] = symbol
+        return symbol
+
+    def allocate(self, name):
+        """Return the symbol for name, allocating one on first use ('' if none is possible)."""
+        symbol = self.assigned.get(name)
+        if symbol is not None:
+            return symbol
+        if name in self.reserved:
+            return self._take(self.reserved[name], name)
+        symbol = self.registry.get(name) if self.registry else None
+        if symbol and self._free(symbol, name):
+            return self._take(symbol, name)
+        # Only generation is timed: the lookups above are too cheap to be worth a clock read
+        started = time.perf_counter()
+        symbol = self._generate(name)
+        self.elapsed += time.perf_counter() - started
+        return symbol
+
+    def _generate(self, name):
+        # Character pool: first letters of the words, then the rest of each word
+        words = [w for w in CLEAN_RE.sub('', name).split(' ') if w and not w.islower()]
+        chars = ''.join([w[0] for w in words]) + ''.join([w[1:] for w in words])
+        # Most names get their very first pair, so try it before setting up the
+        # generator; the others walk the candidates lazily up to the first free one
+        if len(chars) > 1:
+            taken, held = self.taken, self.held
+            candidate = chars[0].upper() + chars[1].lower()
+            if candidate in taken or (held and held.get(candidate, name) != name):
+                for candidate in candidate_symbols(chars, taken):
+                    if not held or held.get(candidate, name) == name:
+                        break
+                else:
+                    candidate = None
+            if candidate:
+                taken[candidate] = name
+                self.assigned[name] = candidate
+                return candidate
+
+        if chars:
+            first_up = chars[0].upper()
+            if self._free(first_up, name):
+                return self._take(first_up, name)
+            # Positions before the cursor are taken (or held for the service that
+            # owns them, which never needs the fallback), so never rescan them
+            pos = self._fallback_pos.get(first_up, 0)
+            while pos < len(FALLBACK_SUFFIXES):
+                candidate = first_up + FALLBACK_SUFFIXES[pos]
+                pos += 1
+                if self._free(candidate, name):
+                    self._fallback_pos[first_up] = pos
+                    return self._take(candidate, name)
+            self._fallback_pos[first_up] = pos
+
+        print("Couldn't generate symbol for %s: %s" % (name, chars or name))
+        return ""
+
+    def registry_snapshot(self):
+        """Symbols assigned in this run, to be persisted as the next run's registry."""
+        return dict(self.assigned)
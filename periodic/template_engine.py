@@ -0,0 +1,218 @@
+"""
+Template engine layer around pystache.
+
+pystache.render() parses the template string on every call, and again every
+partial ({{> google}} etc.) each time the partial tag is rendered. Here the
+template is read once, its partials are inlined (with the same standalone-tag
+indentation rules pystache applies), and the result is parsed once. The parsed
+template is kept at module scope, so warm Lambda invocations and every data
+source reuse it.
+
+The partials in FRAGMENT_PARTIALS (a service tile, a legend entry) are not
+inlined but rendered on their own as Fragments: once per distinct set of
+values of the tags they use, looked up through the same context stack as in
+the page. The page template gets a {{{fragment_<name>}}} tag in their place,
+and render() stores each item's memoized fragment under that name before it
+renders the page. Tiles that are the same as in an earlier render (another
+source, the previous warm invocation) cost a dict lookup instead of a
+template walk.
+"""
+import json
+import os
+import re
+
+TEMPLATE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# {{> name}} on a line of its own (standalone) or anywhere else (inline)
+STANDALONE_PARTIAL_RE = re.compile(r"^([ \t]*)\{\{\s*>\s*([\w.-]+)\s*\}\}(?:\r?\n|\Z)", re.M)
+INLINE_PARTIAL_RE = re.compile(r"\{\{\s*>\s*([\w.-]+)\s*\}\}")
+NON_BLANK_RE = re.compile(r"^(.)", re.M)
+# Name of a variable/section tag ({{name}}, {{{name}}}, {{&name}}, {{#name}}, {{^name}})
+TAG_NAME_RE = re.compile(r"\{\{\s*[#^&{]?\s*([\w.-]+)\s*\}?\}\}")
+# Section tags ({{#name}}, {{^name}}, {{/name}}) and variable tags, in template order
+SECTION_RE = re.compile(r"\{\{\{?\s*([#^/&]?)\s*([\w.-]+)\s*\}?\}\}")
+
+# Partials rendered and memoized separately, and the tag that replaces them
+FRAGMENT_PARTIALS = ('tile', 'legend_entry')
+FRAGMENT_PREFIX = 'fragment_'
+# Memoized renderings per fragment; the memo starts over when it is full
+FRAGMENT_CACHE_SIZE = 20000
+
+
+def _read_template(template_dir, name):
+    path = os.path.join(template_dir, f"{name}.mustache")
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+    except FileNotFoundError:
+        # pystache renders missing partials as empty strings
+        return ''
+
+
+def inline_partials(source, template_dir, depth=0, fragments=None):
+    """
+    Replace partial tags with the (indented) partial templates.
+
+    Args:
+        fragments: dict to collect the partials of FRAGMENT_PARTIALS in
+            (name -> indented source), which are replaced by a
+            {{{fragment_<name>}}} tag instead; None inlines everything
+    """
+    if depth > 10:
+        raise ValueError("Partials nested too deeply (recursive partial?)")
+
+    def partial(name, indent=None):
+        source = inline_partials(_read_template(template_dir, name), template_dir, depth + 1, fragments)
+        if indent:
+            source = NON_BLANK_RE.sub(indent + r'\1', source)
+        if fragments is None or name not in FRAGMENT_PARTIALS:
+            return source
+        # The tag keeps a line of its own, so the tags around it stay standalone
+        newline = '\n' if indent is not None and source.endswith('\n') else ''
+        source = source[:-1] if newline else source
+        if fragments.setdefault(name, source) != source:
+            raise ValueError(f"Fragment partial {name!r} is used with different indentation")
+        return '{{{' + FRAGMENT_PREFIX + name + '}}}' + newline
+
+    source = STANDALONE_PARTIAL_RE.sub(lambda match: partial(match.group(2), match.group(1)), source)
+    return INLINE_PARTIAL_RE.sub(lambda match: partial(match.group(1)), source)
+
+
+def _lookup(stack, name):
+    """Value of a tag name in a context stack (innermost last), like pystache resolves it."""
+    first, *rest = name.split('.')
+    value = None
+    for context in reversed(stack):
+        if isinstance(context, dict) and first in context:
+            value = context[first]
+            break
+    for part in rest:
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+def _section_path(source, tag):
+    """Names of the {{#sections}} enclosing tag in source, outermost first."""
+    stack = []
+    for kind, name in SECTION_RE.findall(source):
+        if kind in ('#', '^'):
+            stack.append((kind, name))
+        elif kind == '/':
+            stack.pop()
+        elif name == tag:
+            return [name for kind, name in stack if kind == '#']
+    return []
+
+
+class Fragment:
+    """
+    A partial rendered on its own, memoized on the values of the tags it uses.
+
+    Args:
+        name: partial name
+        source: partial source, indented as at its place in the page
+        path: sections of the page enclosing the partial, e.g. ['categories', 'services']
+        renderer: pystache.Renderer of the page
+    """
+
+    def __init__(self, name, source, path, renderer):
+        import pystache
+
+        self.tag = FRAGMENT_PREFIX + name
+        self.source = source
+        self.path = path
+        self.names = sorted(set(TAG_NAME_RE.findall(source)))
+        self.parsed = pystache.parse(source)
+        self.renderer = renderer
+        self._memo = {}
+        self.rendered = 0
+        self.reused = 0
+
+    def render(self, *stack):
+        """The fragment for a context stack (innermost last)."""
+        key = tuple(_lookup(stack, name) for name in self.names)
+        try:
+            html = self._memo.get(key)
+        except TypeError:
+            # Unhashable values (lists, dicts)
+            key = json.dumps(key, sort_keys=True, default=str)
+            html = self._memo.get(key)
+        if html is not None:
+            self.reused += 1
+            return html
+        html = self.renderer.render(self.parsed, *stack)
+        if len(self._memo) >= FRAGMENT_CACHE_SIZE:
+            self._memo.clear()
+        self._memo[key] = html
+        self.rendered += 1
+        return html
+
+    def fill(self, context):
+        """Store the fragment of every item along path in the item (under self.tag)."""
+        self._fill(self.path, [context])
+
+    def _fill(self, path, stack):
+        if not path:
+            stack[-1][self.tag] = self.render(*stack)
+            return
+        value = _lookup(stack, path[0])
+        if isinstance(value, list):
+            for item in value:
+                if isinstance(item, dict):
+                    self._fill(path[1:], stack + [item])
+        elif isinstance(value, dict):
+            self._fill(path[1:], stack + [value])
+        elif value:
+            self._fill(path[1:], stack)
+
+
+class TemplateEngine:
+    """
+    A template with its partials, parsed once and rendered many times.
+
+    Args:
+        memoize: render the partials of FRAGMENT_PARTIALS as memoized Fragments
+    """
+
+    def __init__(self, name='base_template', template_dir=TEMPLATE_DIR, memoize=True):
+        self.name = name
+        import pystache  # loaded with the first engine, not at cold start
+
+        fragments = {} if memoize else None
+        self.source = inline_partials(_read_template(template_dir, name), template_dir, fragments=fragments)
+        self.parsed = pystache.parse(self.source)
+        self.renderer = pystache.Renderer()
+        self.fragments = [Fragment(partial, source, _section_path(self.source, FRAGMENT_PREFIX + partial),
+                                   self.renderer)
+                          for partial, source in (fragments or {}).items()]
+        self._keys = None
+
+    def render(self, context):
+        """Render the page; fills the fragment tags into the context dicts first."""
+        for fragment in self.fragments:
+            fragment.fill(context)
+        return self.renderer.render(self.parsed, context)
+
+    def stats(self):
+        """(fragments rendered, fragments reused) since the engine was created."""
+        return (sum(fragment.rendered for fragment in self.fragments),
+                sum(fragment.reused for fragment in self.fragments))
+
+    def uses(self, key):
+        """Whether a tag of the template (with its partials) references key, also as part of a dotted name."""
+        if self._keys is None:
+            sources = [self.source] + [fragment.source for fragment in self.fragments]
+            self._keys = {part for source in sources for name in TAG_NAME_RE.findall(source)
+                          for part in name.split('.')}
+        return key in self._keys
+
+
+_engines = {}
+
+
+def get_engine(name='base_template'):
+    """Return the module-level engine for a template, creating it on first use."""
+    engine = _engines.get(name)
+    if engine is None:
+        engine = _engines[name] = TemplateEngine(name)
+    return engine